@@ -1,7 +1,15 @@
 import chess
 import math
 import random
-from typing import Optional, Tuple, List
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple, List
+from book import BOOK_PATH, OpeningBook
+from position_store import PositionStore
+from search_board import EP_FLAG, SearchBoard, pst_table
+from search_stats import SearchStats
+from tablebase import SYZYGY_DIR, Tablebase
+from transposition import TranspositionTable, history_keys, EXACT, LOWER, UPPER
 
 PIECE_VALUES = {
     chess.PAWN: 100,
@@ -26,7 +34,7 @@ KNIGHT_TABLE = [
     -50,-40,-30,-30,-30,-30,-40,-50,
     -40,-20,  0,  0,  0,  0,-20,-40,
     -30,  0, 10, 15, 15, 10,  0,-30,
-    -30,  5, 15, 20, 20,  5,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
     -30,  0, 15, 20, 20, 15,  0,-30,
     -30,  5, 10, 15, 15, 10,  5,-30,
     -40,-20,  0,  5,  5,  0,-20,-40,
@@ -81,77 +89,604 @@ TABLES = {
     chess.KING: KING_TABLE,
 }
 
-def evaluate(board: chess.Board) -> int:
+MATE_SCORE = 99999
+MAX_DEPTH = 64
+# запас для delta pruning: взятие, не поднимающее оценку хотя бы до alpha - DELTA_MARGIN, не смотрим
+DELTA_MARGIN = 200
+# выборочный поиск: сокращение глубины для нулевого хода и поздних тихих ходов
+NULL_MOVE_R = 2
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVE = 3  # первые ходы по порядку (хеш-ход, взятия) всегда на полную глубину
+KILLER_SLOTS = 2
+HISTORY_MASK = (1 << 14) - 1  # «откуда | куда» в ходе SearchBoard
+
+class _SearchAborted(Exception):
+    pass
+
+# материал + PST для каждой фигуры на каждой клетке, со знаком (белые — плюс)
+PIECE_SQUARE = {
+    chess.WHITE: {pt: [PIECE_VALUES[pt] + TABLES[pt][sq] for sq in chess.SQUARES] for pt in TABLES},
+    chess.BLACK: {pt: [-(PIECE_VALUES[pt] + TABLES[pt][chess.square_mirror(sq)]) for sq in chess.SQUARES] for pt in TABLES},
+}
+# то же в раскладке SearchBoard (фигура со знаком цвета)
+SEARCH_PST = pst_table({(pt if color else -pt): PIECE_SQUARE[color][pt] for color in chess.COLORS for pt in TABLES})
+
+def terminal_score(board: chess.Board) -> Optional[int]:
     if board.is_checkmate():
-        return -99999 if board.turn else 99999
+        return -MATE_SCORE if board.turn else MATE_SCORE
     if board.is_stalemate() or board.is_insufficient_material() or board.can_claim_threefold_repetition():
         return 0
+    return None
+
+def squares_score(board: chess.Board, squares) -> int:
+    """Материал + PST фигур на заданных клетках (белые — плюс)."""
     score = 0
-    for sq in chess.SQUARES:
-        p = board.piece_at(sq)
-        if not p:
-            continue
-        val = PIECE_VALUES[p.piece_type]
-        pst = TABLES[p.piece_type][sq if p.color == chess.WHITE else chess.square_mirror(sq)]
-        score += (val + pst) if p.color == chess.WHITE else -(val + pst)
+    for sq in squares:
+        pt = board.piece_type_at(sq)
+        if pt:
+            score += PIECE_SQUARE[board.color_at(sq)][pt][sq]
     return score
 
+def material_score(board: chess.Board) -> int:
+    return squares_score(board, chess.scan_forward(board.occupied))
+
+def mvv_lva(board: SearchBoard, m: int) -> int:
+    """Самая ценная жертва — самым дешёвым нападающим; превращение добавляет ценность новой фигуры."""
+    promo = m >> 14 & 7
+    victim = chess.PAWN if m >> 17 & EP_FLAG else board.piece_type(m >> 7 & 127)
+    score = PIECE_VALUES[victim] * 10 - board.piece_type(m & 127) if victim else 0
+    if promo:
+        score += PIECE_VALUES[promo] * 10
+    return score
+
+def evaluate(board: chess.Board) -> int:
+    score = terminal_score(board)
+    return material_score(board) if score is None else score
+
 class ChessAI:
-    def __init__(self, max_depth: int = 3, randomness: float = 0.0):
+    def __init__(self, max_depth: int = 3, tt_size_mb: float = 16,
+                 quiescence: bool = True, book_path: Optional[str] = BOOK_PATH,
+                 syzygy_dir: Optional[str] = SYZYGY_DIR, store_path: Optional[str] = None,
+                 selective: bool = False, node_budget: Optional[int] = None,
+                 time_budget: Optional[float] = None, margin: int = 0):
         self.max_depth = max_depth
-        self.rand = randomness
-
-    def choose_move(self, board: chess.Board) -> Optional[chess.Move]:
-        best = -math.inf
-        best_moves: List[chess.Move] = []
-        for mv in self._ordered_moves(board):
-            board.push(mv)
-            score = -self._alphabeta(board, self.max_depth - 1, -math.inf, math.inf)
-            board.pop()
-            if score > best:
-                best = score
-                best_moves = [mv]
-            elif score == best:
-                best_moves.append(mv)
-        if not best_moves:
+        # бюджет хода (узлы / секунды): с ним choose_move углубляется итеративно до max_depth,
+        # пока бюджет не кончится. margin — ослабление после поиска: ход выбирается случайно
+        # среди уступающих лучшему не больше чем на margin (ближе к лучшему — вероятнее)
+        self.node_budget = node_budget
+        self.time_budget = time_budget
+        self.margin = margin
+        self.quiescence = quiescence
+        # выборочный поиск; каждую часть можно выключить отдельно, чтобы мерить её вклад.
+        # Без него оценки точные, как у полного перебора alpha-beta той же глубины.
+        self.pvs = selective            # нулевое окно для всех ходов, кроме первого
+        self.null_move = selective      # пропуск хода: позиция и так лучше beta — отсекаем
+        self.lmr = selective            # поздние тихие ходы — сначала на уменьшенную глубину
+        self.check_ext = selective      # шах — +1 к глубине
+        # книга и таблицы подключаются, только если файлы есть на диске
+        self.book = OpeningBook(book_path)
+        self.tablebase = Tablebase(syzygy_dir)
+        # результаты прошлых запусков (position_store.STORE_PATH); по умолчанию выключено
+        self.store = PositionStore(store_path)
+        # таблица живёт всю партию: результаты прошлых ходов ускоряют следующие
+        self.tt = TranspositionTable(tt_size_mb)
+        self._keys: List[int] = []
+        self._root_len = 0  # длина _keys в корне поиска (для глубины от корня)
+        # поиск видел повторение, начатое ещё до корня: оценки зависят от истории партии
+        self._history_draw = False
+        # сортировка тихих ходов: «ходы-убийцы» по глубине от корня и история отсечений [цвет][откуда][куда]
+        self._killers: List[List[Optional[int]]] = []
+        self._history = [0] * (2 << 14)
+        self._new_killers()
+        self._deadline: Optional[float] = None
+        self._node_deadline: Optional[int] = None
+        self._stop = threading.Event()
+        self.nodes = 0
+        self.qnodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.depth_reached = 0
+        self._budget_depth = 0  # до какой глубины дошёл прошлый поиск с бюджетом
+        self.time_used = 0.0  # сколько на самом деле занял последний поиск, с
+        # статистика: last_stats после каждого поиска, on_stats — колбэк, profiler — cProfile.Profile
+        self.last_stats: Optional[SearchStats] = None
+        self.on_stats: Optional[Callable[[SearchStats], None]] = None
+        # on_iteration(depth, оценки корневых ходов) — после каждой итерации углубления (строки info в UCI)
+        self.on_iteration: Optional[Callable[[int, List[Tuple[chess.Move, int]]], None]] = None
+        self.profiler = None
+        self._search_kind = ""
+        self._search_start = time.perf_counter()
+        self._counters_start = self._counters()
+        self._depth_times = {}
+        self._depth_nodes = {}
+
+    def new_game(self):
+        self.tt.clear()
+        self._history = [0] * (2 << 14)
+
+    def stop(self):
+        """Прерывает текущий поиск; безопасно вызывать из другого потока."""
+        self._stop.set()
+
+    def stats_snapshot(self) -> SearchStats:
+        """Статистика текущего (или последнего) поиска; можно читать из другого потока прямо во время поиска."""
+        now = self._counters()
+        return SearchStats(self._search_kind, self.depth_reached, time.perf_counter() - self._search_start,
+                           *(b - a for a, b in zip(self._counters_start, now)),
+                           depth_times=dict(self._depth_times), depth_nodes=dict(self._depth_nodes))
+
+    def _counters(self) -> Tuple[int, ...]:
+        # порядок — как в search_stats.COUNTERS
+        return (self.nodes, self.qnodes, self.leaf_evals, self.cutoffs, self.first_cutoffs,
+                self.tt.probes, self.tt.hits, self.book.hits, self.book.misses,
+                self.tablebase.hits, self.tablebase.misses, self.store.hits, self.store.misses)
+
+    def _begin_search(self, kind: str):
+        self._search_kind = kind
+        self._depth_times = {}
+        self._depth_nodes = {}
+        self.depth_reached = 0
+        self._counters_start = self._counters()
+        self._search_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def _end_search(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.last_stats = self.stats_snapshot()
+        self.time_used = self.last_stats.elapsed
+        if self.on_stats is not None:
+            self.on_stats(self.last_stats)
+
+    def _depth_done(self, depth: int, started: float, nodes: int):
+        self.depth_reached = depth
+        self._depth_times[depth] = time.perf_counter() - started
+        self._depth_nodes[depth] = self.nodes + self.qnodes - nodes
+
+    def choose_move(self, board: chess.Board, movetime: Optional[float] = None,
+                    depth: Optional[int] = None, nodes: Optional[int] = None) -> Optional[chess.Move]:
+        """Лучший ход. С movetime (секунды), depth и/или nodes — итеративное углубление до этих пределов
+        (по умолчанию time_budget / node_budget); без них — поиск на max_depth.
+        stop() прерывает углубление, возвращается ход последней итерации. Затраченное время — time_used."""
+        self._begin_search("choose_move")
+        try:
+            return self._choose_move(board, movetime, depth, nodes)
+        finally:
+            self._end_search()
+
+    def _choose_move(self, board: chess.Board, movetime: Optional[float],
+                     depth: Optional[int] = None, nodes: Optional[int] = None) -> Optional[chess.Move]:
+        mv = self._probe_root(board)
+        if mv is not None:
+            return mv
+        self.tt.new_search()
+        self._new_killers()
+        self._stop.clear()
+        self._history_draw = False
+        movetime = movetime if movetime is not None else self.time_budget
+        nodes = nodes if nodes is not None else self.node_budget
+        if nodes is not None and depth is None:
+            depth = self.max_depth
+        margin = self._root_margin()
+        # позиция уже искалась не мельче, чем пойдёт этот поиск, — ответ готов. С бюджетом
+        # потолок max_depth обычно не достигается: хватает глубины прошлого такого поиска
+        target = depth or self.max_depth
+        if (movetime is not None or nodes is not None) and self._budget_depth:
+            target = min(target, self._budget_depth)
+        # ослабление выбирает среди ходов в пределах self.margin — все они должны быть в записи
+        stored = self.store.lookup(board, target, margin=self.margin, config=self._store_config())
+        if stored is not None:
+            scored = [(pv[0], score) for pv, score in stored]
+        elif movetime is None and depth is None:
+            started, nodes = time.perf_counter(), self.nodes + self.qnodes
+            try:
+                scored = self._search_root(board, self.max_depth, margin=margin)
+            except _SearchAborted:
+                return None
+            self._depth_done(self.max_depth, started, nodes)
+            self._save_root(board, self.max_depth, scored, margin)
+        else:
+            scored = self._iterative(board, movetime, depth or MAX_DEPTH, nodes)
+            if self.depth_reached:
+                if not self._stop.is_set():  # остановленный извне поиск — не мерка
+                    self._budget_depth = self.depth_reached
+                self._save_root(board, self.depth_reached, scored, margin)
+        if not scored:
             return None
-        if self.rand > 0 and len(best_moves) > 1 and random.random() < self.rand:
-            return random.choice(best_moves)
+        best = max(score for _, score in scored)
+        if self.margin > 0 and best < MATE_SCORE:
+            # ослабление: ходы в пределах margin от лучшего, вес падает с потерей
+            candidates = [(mv, score) for mv, score in scored if score >= best - self.margin]
+            weights = [math.exp(-3.0 * (best - score) / self.margin) for _, score in candidates]
+            return random.choices([mv for mv, _ in candidates], weights)[0]
+        best_moves = [mv for mv, score in scored if score == best]
         return random.choice(best_moves)
 
     def top_moves(self, board: chess.Board, k: int = 5) -> List[Tuple[chess.Move, int]]:
+        return [(pv[0], score) for pv, score in self.top_lines(board, k)]
+
+    def top_lines(self, board: chess.Board, k: int = 5) -> List[Tuple[List[chess.Move], int]]:
+        """k лучших вариантов (multi-PV): главный вариант и оценка для каждого."""
+        self._begin_search("top_moves")
+        try:
+            return self._top_lines(board, k)
+        finally:
+            self._end_search()
+
+    def _root_margin(self) -> Optional[int]:
+        """Насколько хуже лучшего хода корневые оценки ещё нужны точными (None — все)."""
+        if self.margin > 0:
+            return self.margin
+        return 0 if self.pvs else None
+
+    def _save_root(self, board: chess.Board, depth: int, scored: List[Tuple[chess.Move, int]],
+                   margin: Optional[int]):
+        if not scored or self._history_draw:
+            return  # мат или пат — сохранять нечего; ничья повторением из этой партии — не для других
+        if margin is None:
+            self.store.save(board, depth, [([mv], sc) for mv, sc in scored], complete=True,
+                            config=self._store_config())
+            return
+        # точны только оценки в пределах margin от лучшей, остальные — верхние границы
+        best = max(sc for _, sc in scored)
+        self.store.save(board, depth, [([mv], sc) for mv, sc in scored if sc >= best - margin],
+                        margin=margin, config=self._store_config())
+
+    def _store_config(self) -> str:
+        """Настройки, от которых зависят оценки: записи хранилища с другими не читаются."""
+        return "".join("1" if flag else "0" for flag in
+                       (self.quiescence, self.pvs, self.null_move, self.lmr, self.check_ext))
+
+    def _top_lines(self, board: chess.Board, k: int) -> List[Tuple[List[chess.Move], int]]:
+        stored = self.store.lookup(board, self.max_depth, k, config=self._store_config())
+        if stored is not None:
+            return stored[:k]
+        self.tt.new_search()
+        self._new_killers()
+        self._stop.clear()
+        self._history_draw = False
+        started, nodes = time.perf_counter(), self.nodes + self.qnodes
+        try:
+            best = self._search_multipv(board, self.max_depth, k)
+        except _SearchAborted:
+            return []
+        self._depth_done(self.max_depth, started, nodes)
+        lines = [(self._principal_variation(board, mv, self.max_depth), score) for mv, score in best]
+        # не вошедшие в k ходы не лучше k-го: точны все ходы строго лучше него
+        margin = lines[0][1] - lines[-1][1] - 1 if lines else 0
+        if not self._history_draw:
+            self.store.save(board, self.max_depth, lines, complete=len(lines) == board.legal_moves.count(),
+                            margin=margin, config=self._store_config())
+        return lines
+
+    def _search_multipv(self, board: chess.Board, depth: int, k: int) -> List[Tuple[chess.Move, int]]:
+        if k <= 0:
+            return []
+        moves = self._ordered_moves(board)
+        best = self._search_root(board, depth, moves[:k])
+        # остальные ходы ищем с окном от k-й оценки: слабые отсекаются дёшево
+        for mv in moves[k:]:
+            best.sort(key=lambda x: x[1], reverse=True)
+            bound = best[-1][1]
+            scored = self._search_root(board, depth, [mv], bound)[0]
+            if scored[1] > bound:
+                best[-1] = scored
+        best.sort(key=lambda x: x[1], reverse=True)
+        return best
+
+    def expected_reply(self, board: chess.Board, mv: chess.Move) -> Optional[chess.Move]:
+        """Ожидаемый ответ соперника на mv — следующий ход главного варианта из таблицы транспозиций."""
+        pv = self._principal_variation(board, mv, 2)
+        return pv[1] if len(pv) > 1 else None
+
+    def _principal_variation(self, board: chess.Board, first: chess.Move, depth: int) -> List[chess.Move]:
+        pv = [first]
+        sb = SearchBoard(board)
+        sb.make(sb.from_move(first))
+        while len(pv) < depth:
+            entry = self.tt.probe(sb.key)
+            if entry is None or entry[4] is None or not sb.is_pseudo_legal(entry[4]) or not sb.make(entry[4]):
+                break
+            pv.append(sb.to_move(entry[4]))
+        return pv
+
+    def _probe_root(self, board: chess.Board) -> Optional[chess.Move]:
+        """Ход без поиска: из дебютной книги или по эндшпильным таблицам."""
+        mv = self.book.move(board)
+        if mv is None and self.tablebase.applicable(board):
+            mv = self.tablebase.root_move(board)
+        return mv
+
+    def _iterative(self, board: chess.Board, movetime: Optional[float], max_depth: int = MAX_DEPTH,
+                   node_budget: Optional[int] = None) -> List[Tuple[chess.Move, int]]:
+        start = time.monotonic()
+        start_nodes = self.nodes + self.qnodes
+        self._deadline = start + movetime if movetime is not None else None
+        margin = self._root_margin()
+        scored: List[Tuple[chess.Move, int]] = []
+        order: Optional[List[chess.Move]] = None
+        try:
+            for depth in range(1, min(max_depth, MAX_DEPTH) + 1):
+                started, nodes = time.perf_counter(), self.nodes + self.qnodes
+                try:
+                    result = self._search_root(board, depth, order, margin=margin)
+                except _SearchAborted:
+                    break
+                scored = result
+                self._depth_done(depth, started, nodes)
+                if node_budget is not None:
+                    # бюджет узлов действует со второй итерации: глубина 1 доигрывается всегда
+                    self._node_deadline = start_nodes + node_budget
+                if self.on_iteration is not None:
+                    self.on_iteration(depth, scored)
+                # следующую итерацию начинаем с лучших ходов этой (главный вариант — первым)
+                order = [mv for mv, _ in sorted(scored, key=lambda x: x[1], reverse=True)]
+                if len(order) <= 1 or max(sc for _, sc in scored) >= MATE_SCORE:
+                    break
+                # следующая глубина обычно в несколько раз дольше — не начинаем, если не успеем
+                if movetime is not None and time.monotonic() - start > movetime / 2:
+                    break
+                if node_budget is not None and self.nodes + self.qnodes - start_nodes > node_budget / 2:
+                    break
+        finally:
+            self._deadline = None
+            self._node_deadline = None
+        if not scored:
+            # не успели даже глубину 1 — любой легальный ход лучше, чем никакого
+            scored = [(mv, 0) for mv in self._ordered_moves(board)[:1]]
+        return scored
+
+    def _search_root(self, board: chess.Board, depth: int, order: Optional[List[chess.Move]] = None,
+                     alpha: float = -math.inf, margin: Optional[int] = None) -> List[Tuple[chess.Move, int]]:
+        """Оценки корневых ходов. Оценка не выше alpha — лишь верхняя граница (ход хуже alpha).
+
+        margin — поднимать alpha до «лучшая оценка − margin − 1»: ходы в пределах margin
+        от лучшего остаются точными (для случайного выбора), остальные отсекаются дешевле.
+        """
+        # поиск идёт на своей доске (SearchBoard): board не меняется, даже если поиск прерван
+        sb = SearchBoard(board, SEARCH_PST)
+        # история партии нужна, чтобы ловить повторения, начатые ещё до корня
+        self._keys = history_keys(board) + [sb.key]
+        self._root_len = len(self._keys)
         out = []
-        for mv in self._ordered_moves(board):
-            board.push(mv)
-            score = -self._alphabeta(board, self.max_depth - 1, -math.inf, math.inf)
-            board.pop()
+        for mv in order if order is not None else self._ordered_moves(board):
+            self._make(sb, sb.from_move(mv))
+            score = -self._alphabeta(sb, depth - 1, -math.inf, -alpha)
+            self._unmake(sb)
             out.append((mv, score))
-        out.sort(key=lambda x: x[1], reverse=True)
-        return out[:k]
+            if margin is not None and score - margin - 1 > alpha:
+                alpha = score - margin - 1
+        return out
+
+    def _make(self, sb: SearchBoard, m: int, in_check: bool = True) -> bool:
+        """Ход на доске поиска; False — ход нелегален (доска не изменилась)."""
+        if not sb.make(m, in_check):
+            return False
+        self._keys.append(sb.key)
+        return True
+
+    def _unmake(self, sb: SearchBoard):
+        sb.unmake()
+        self._keys.pop()
 
-    def _alphabeta(self, board: chess.Board, depth: int, alpha: float, beta: float) -> int:
-        if depth == 0 or board.is_game_over():
-            return evaluate(board)
+    def _evaluate(self, sb: SearchBoard, in_check: Optional[bool] = None) -> int:
+        """Оценка листа с точки зрения стороны, которая ходит (так требует негамакс)."""
+        self.leaf_evals += 1
+        if self._is_draw(sb):
+            return 0
+        if in_check is None:
+            in_check = sb.in_check()
+        # достаточно найти один легальный ход — полный перебор не нужен
+        if not sb.has_legal_move(in_check):
+            return -MATE_SCORE if in_check else 0
+        return sb.score if sb.white else -sb.score
+
+    def _is_draw(self, sb: SearchBoard) -> bool:
+        """Недостаточно материала или троекратное повторение (как is_repetition(3)) без перебора ходов."""
+        if sb.is_insufficient_material():
+            return True
+        hmc = sb.halfmove
+        # повторение возможно только среди позиций после последнего необратимого хода
+        if hmc < 4 or self._keys[-1 - hmc:-1].count(self._keys[-1]) < 2:
+            return False
+        # корень — _keys[_root_len - 1]; всё, что раньше, — история этой партии
+        if self._keys[self._root_len - 1:-1].count(self._keys[-1]) < 2:
+            self._history_draw = True
+        return True
+
+    def _probe_tablebase(self, sb: SearchBoard) -> Optional[int]:
+        tb = self.tablebase
+        if not tb.available or sb.castling or sb.piece_count() > tb.max_pieces:
+            return None
+        return tb.score(sb.to_board())
+
+    def _out_of_budget(self) -> bool:
+        return (self._stop.is_set()
+                or self._deadline is not None and time.monotonic() >= self._deadline
+                or self._node_deadline is not None and self.nodes + self.qnodes >= self._node_deadline)
+
+    def _alphabeta(self, sb: SearchBoard, depth: int, alpha: float, beta: float) -> int:
+        self.nodes += 1
+        if not self.nodes & 63 and self._out_of_budget():
+            raise _SearchAborted
+        in_check = sb.in_check()
+        if in_check and self.check_ext and len(self._keys) - self._root_len < MAX_DEPTH:
+            depth += 1
+        if depth == 0:
+            return self._quiesce(sb, alpha, beta, in_check) if self.quiescence else self._evaluate(sb, in_check)
+        if self._is_draw(sb):
+            return 0
+        score = self._probe_tablebase(sb)
+        if score is not None:
+            return score
+        key = self._keys[-1]
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            _, e_depth, flag, e_score, tt_move, _ = entry
+            if e_depth >= depth:
+                if flag == EXACT:
+                    return e_score
+                if flag == LOWER and e_score > alpha:
+                    alpha = e_score
+                elif flag == UPPER and e_score < beta:
+                    beta = e_score
+                if alpha >= beta:
+                    return e_score
+        if self.null_move and self._null_move_cutoff(sb, depth, beta, in_check):
+            return beta
+        alpha_orig = alpha
         val = -math.inf
-        for mv in self._ordered_moves(board):
-            board.push(mv)
-            score = -self._alphabeta(board, depth - 1, -beta, -alpha)
-            board.pop()
+        best_move = None
+        ply = len(self._keys) - self._root_len
+        i = -1
+        for mv in self._staged_moves(sb, tt_move, ply):
+            quiet = not sb.is_capture(mv) and not mv >> 14 & 7
+            # легальность проверяется только здесь, при самом ходе
+            if not self._make(sb, mv, in_check):
+                continue
+            i += 1
+            if i == 0 or alpha == -math.inf or not (self.pvs or self.lmr):
+                score = -self._alphabeta(sb, depth - 1, -beta, -alpha)
+            else:
+                reduce = (self.lmr and quiet and not in_check and i >= LMR_MIN_MOVE and depth >= LMR_MIN_DEPTH
+                          and not sb.in_check())
+                # нулевое окно только проверяет «лучше ли alpha»; точная оценка — перепоиском
+                window = -alpha - 1 if self.pvs else -beta
+                score = -self._alphabeta(sb, depth - 2 if reduce else depth - 1, window, -alpha)
+                if reduce and score > alpha:
+                    score = -self._alphabeta(sb, depth - 1, window, -alpha)
+                if self.pvs and alpha < score < beta:
+                    score = -self._alphabeta(sb, depth - 1, -beta, -alpha)
+            self._unmake(sb)
             if score > val:
                 val = score
+                best_move = mv
             if val > alpha:
                 alpha = val
             if alpha >= beta:
+                self.cutoffs += 1
+                if i == 0:
+                    self.first_cutoffs += 1
+                if quiet:
+                    self._remember_quiet_cutoff(sb, mv, depth, ply)
                 break
-        return val if val != -math.inf else evaluate(board)
-
-    def _ordered_moves(self, board: chess.Board):
-        def mv_score(m: chess.Move):
-            s = 0
-            if board.is_capture(m): s += 1000
-            if board.gives_check(m): s += 50
-            if m.promotion: s += 900
-            return s
-        mv = list(board.legal_moves)
-        mv.sort(key=mv_score, reverse=True)
-        return mv
+        if i < 0:
+            return -MATE_SCORE if in_check else 0
+        flag = UPPER if val <= alpha_orig else LOWER if val >= beta else EXACT
+        self.tt.store(key, depth, flag, val, best_move)
+        return val
+
+    def _null_move_cutoff(self, sb: SearchBoard, depth: int, beta: float, in_check: bool) -> bool:
+        """Пропускаем ход: если даже так противник не опускает оценку ниже beta — ветку можно отсечь.
+
+        Не применяется под шахом, два раза подряд, у корня окна без границы и когда
+        у стороны одни пешки (в таких эндшпилях цугцванг — обычное дело).
+        """
+        if in_check or depth < NULL_MOVE_R + 1 or beta >= MATE_SCORE or beta == math.inf:
+            return False
+        if sb.last_null or not sb.has_pieces():
+            return False
+        static = sb.score if sb.white else -sb.score
+        if static < beta:
+            return False
+        sb.make_null()
+        self._keys.append(sb.key)
+        try:
+            score = -self._alphabeta(sb, depth - 1 - NULL_MOVE_R, -beta, -beta + 1)
+        finally:
+            self._keys.pop()
+            sb.unmake_null()
+        return score >= beta
+
+    def _quiesce(self, sb: SearchBoard, alpha: float, beta: float, in_check: Optional[bool] = None) -> int:
+        """Досчёт взятий и превращений до спокойной позиции (против эффекта горизонта).
+
+        Шахи здесь не разбираются отдельно: мат распознаёт сама оценка, а полный
+        перебор ответов на шах раздувает дерево в разы.
+        """
+        self.qnodes += 1
+        if not self.qnodes & 63 and self._out_of_budget():
+            raise _SearchAborted
+        if in_check is None:
+            in_check = sb.in_check()
+        stand = best = self._evaluate(sb, in_check)
+        if best >= beta:
+            return best
+        if best > alpha:
+            alpha = best
+        for mv in self._tactical_moves(sb):
+            if not mv >> 14 & 7:
+                to = mv >> 7 & 127
+                victim = chess.PAWN if mv >> 17 & EP_FLAG else sb.piece_type(to)
+                if stand + PIECE_VALUES[victim] + DELTA_MARGIN <= alpha:
+                    continue
+                # дорогая фигура берёт дешёвую под защитой — заведомо плохой размен
+                attacker = sb.piece_type(mv & 127)
+                if PIECE_VALUES[attacker] > PIECE_VALUES[victim] and sb.attacked(to, not sb.white):
+                    continue
+            if not self._make(sb, mv, in_check):
+                continue
+            score = -self._quiesce(sb, -beta, -alpha)
+            self._unmake(sb)
+            if score > best:
+                best = score
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+        return best
+
+    def _tactical_moves(self, sb: SearchBoard) -> List[int]:
+        moves = sb.tactical_moves()
+        moves.sort(key=lambda m: mvv_lva(sb, m), reverse=True)
+        return moves
+
+    def _new_killers(self):
+        self._killers = [[None] * KILLER_SLOTS for _ in range(2 * MAX_DEPTH + 2)]
+
+    def _remember_quiet_cutoff(self, sb: SearchBoard, mv: int, depth: int, ply: int):
+        killers = self._killers[min(ply, len(self._killers) - 1)]
+        if killers[0] != mv:
+            killers[1:] = killers[:-1]
+            killers[0] = mv
+        self._history[sb.white << 14 | mv & HISTORY_MASK] += depth * depth
+
+    def _staged_moves(self, sb: SearchBoard, tt_move: Optional[int], ply: int) -> Iterator[int]:
+        """Псевдолегальные ходы узла по стадиям; следующая стадия генерируется, только если до неё дошёл перебор.
+
+        Хеш-ход, затем взятия и превращения по MVV-LVA, затем ходы-убийцы этой глубины,
+        затем остальные тихие ходы по истории отсечений. Отсечение на хеш-ходе
+        обходится вообще без генерации ходов.
+        """
+        if tt_move is not None and sb.is_pseudo_legal(tt_move):
+            yield tt_move
+        else:
+            tt_move = None
+        for mv in self._tactical_moves(sb):
+            if mv != tt_move:
+                yield mv
+        killers = []
+        for mv in self._killers[min(ply, len(self._killers) - 1)]:
+            if (mv is not None and mv != tt_move and not mv >> 14 & 7 and not sb.is_capture(mv)
+                    and sb.is_pseudo_legal(mv)):
+                killers.append(mv)
+                yield mv
+        history = self._history
+        base = sb.white << 14
+        quiets = [mv for mv in sb.quiet_moves() if mv != tt_move and mv not in killers]
+        quiets.sort(key=lambda m: history[base | m & HISTORY_MASK], reverse=True)
+        yield from quiets
+
+    def _ordered_moves(self, board: chess.Board, first: Optional[chess.Move] = None) -> List[chess.Move]:
+        """Все легальные ходы сразу (для корня) — в том же порядке, что и в узлах поиска."""
+        sb = SearchBoard(board)
+        in_check = sb.in_check()
+        out = []
+        for mv in self._staged_moves(sb, sb.from_move(first) if first is not None else None, 0):
+            if sb.make(mv, in_check):
+                sb.unmake()
+                out.append(sb.to_move(mv))
+        return out
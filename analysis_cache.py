@@ -0,0 +1,39 @@
+import chess
+from collections import OrderedDict
+from typing import List, Tuple
+from ai import ChessAI
+from transposition import zobrist_key
+
+
+class AnalysisCache:
+    """LRU-кэш результатов ChessAI.top_moves по хешу позиции.
+
+    Подсказки, подсветка и советы в одном кадре запрашивают одну и ту же позицию —
+    поиск выполняется один раз, дальше ответ берётся из кэша.
+    """
+
+    def __init__(self, ai: ChessAI, capacity: int = 256):
+        self.ai = ai
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[int, List[Tuple[chess.Move, int]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def top_moves(self, board: chess.Board, k: int = 5) -> List[Tuple[chess.Move, int]]:
+        key = (zobrist_key(board), self.ai.max_depth)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= k:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1][:k]
+        self.misses += 1
+        result = self.ai.top_moves(board, k)
+        if result:
+            self._entries[key] = (k, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._entries.clear()
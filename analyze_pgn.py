@@ -0,0 +1,133 @@
+import argparse
+import io
+import json
+import os
+import sys
+import chess
+import chess.pgn
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+from ai import ChessAI
+from analysis_cache import AnalysisCache
+from tips import score_to_str, top_tips
+
+# потеря (в сантипешках) относительно лучшего хода -> NAG
+MISTAKE_NAGS = ((300, chess.pgn.NAG_BLUNDER), (100, chess.pgn.NAG_MISTAKE), (50, chess.pgn.NAG_DUBIOUS_MOVE))
+
+# движок процесса-воркера: создаётся один раз на процесс
+_worker_cache: Optional[AnalysisCache] = None
+
+
+def _init_worker(depth: int, tt_size_mb: float):
+    global _worker_cache
+    _worker_cache = AnalysisCache(ChessAI(max_depth=depth, tt_size_mb=tt_size_mb))
+
+
+def read_games(stream) -> Iterator[Tuple[int, str]]:
+    """Партии по одной, как текст PGN: весь файл в памяти не держим."""
+    index = 0
+    while True:
+        game = chess.pgn.read_game(stream)
+        if game is None:
+            return
+        yield index, str(game)
+        index += 1
+
+
+def analyze_game(index: int, pgn_text: str, k: int) -> Tuple[int, str, List[Dict]]:
+    """Разбор одной партии в воркере: аннотированный PGN и по записи на каждый ход.
+
+    Оценки — с точки зрения стороны, делающей ход. Если сыгранного хода нет среди
+    k лучших, он ищется отдельно из той же позиции на ту же глубину — иначе потеря
+    сравнивала бы оценки разной глубины; таблица транспозиций после top-k делает это дёшево.
+    """
+    cache = _worker_cache
+    cache.ai.new_game()
+    cache.clear()
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+    board = game.board()
+    records: List[Dict] = []
+    for ply, node in enumerate(game.mainline()):
+        top, mv = cache.top_moves(board, k), node.move
+        tips = top_tips(board, cache, k) if top else []  # из кэша, без нового поиска
+        san = board.san(mv)
+        played = dict(top).get(mv)
+        if played is None:
+            played = cache.ai._search_root(board, cache.ai.max_depth, [mv])[0][1]
+        best = top[0][1] if top else played
+        loss = max(0, best - played)
+        records.append({
+            "game": index, "ply": ply, "fen": board.fen(), "move": mv.uci(), "san": san,
+            "score": played, "best": top[0][0].uci() if top else None, "best_score": best, "loss": loss,
+            "top": [[m.uci(), s] for m, s in top], "tips": tips,
+        })
+        nag = next((nag for threshold, nag in MISTAKE_NAGS if loss >= threshold), None)
+        if nag is not None:
+            node.nags.add(nag)
+            node.comment = f"{score_to_str(played)}; лучше {board.san(top[0][0])} {score_to_str(best)}"
+        else:
+            node.comment = score_to_str(played)
+        board.push(mv)
+    game.headers["Annotator"] = f"ChessAI depth {cache.ai.max_depth}"
+    return index, str(game), records
+
+
+def run(src, out, fmt: str = "pgn", depth: int = 2, k: int = 3, workers: int = 1,
+        inflight: Optional[int] = None, tt_size_mb: float = 16) -> int:
+    """Разбирает все партии из src, результаты пишет в out по мере готовности.
+
+    Заданий в работе не больше inflight, поэтому память не зависит от размера файла.
+    Партии в out идут в порядке завершения; в JSONL номер партии — в поле game.
+    """
+    inflight = inflight or workers * 2
+    done = 0
+    games = read_games(src)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(depth, tt_size_mb)) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < inflight:
+                item = next(games, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(analyze_game, item[0], item[1], k))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                index, pgn_text, records = fut.result()
+                if fmt == "jsonl":
+                    for rec in records:
+                        out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                else:
+                    out.write(pgn_text + "\n\n")
+                out.flush()
+                done += 1
+                print(f"[analyze] {done} games", file=sys.stderr)
+    return done
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Batch analysis of a PGN file with ChessAI")
+    ap.add_argument("pgn", help="input PGN file")
+    ap.add_argument("-o", "--out", help="output file (default: stdout)")
+    ap.add_argument("--format", choices=("pgn", "jsonl"), default="pgn")
+    ap.add_argument("--depth", type=int, default=2)
+    ap.add_argument("-k", type=int, default=3, help="number of candidate moves per position")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--inflight", type=int, help="max games queued in the pool (default: 2 per worker)")
+    args = ap.parse_args(argv)
+
+    with open(args.pgn, encoding="utf-8", errors="replace") as src:
+        out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+        try:
+            run(src, out, args.format, args.depth, args.k, args.workers, args.inflight)
+        finally:
+            if args.out:
+                out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import chess
+from typing import Iterable, List, Tuple
+from ai import PIECE_SQUARE, evaluate, material_score, terminal_score
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для пакетного бэкенда
+    np = None
+
+BACKENDS = ("numpy", "python")
+
+# порядок плоскостей: белые P..K, затем чёрные P..K
+_PLANES = [(color, pt) for color in (chess.WHITE, chess.BLACK) for pt in chess.PIECE_TYPES]
+_PST = None
+
+
+def _pst():
+    global _PST
+    if _PST is None:
+        _PST = np.array([PIECE_SQUARE[color][pt] for color, pt in _PLANES], dtype=np.int64)
+    return _PST
+
+
+def default_backend() -> str:
+    return "numpy" if np is not None else "python"
+
+
+def piece_planes(boards: List[chess.Board]):
+    """Битборды фигур -> массив (N, 12, 64) из 0/1, клетка a1 = индекс 0."""
+    # 6 битбордов типов и 2 битборда цветов на позицию; pieces_mask(pt, color) = тип & цвет
+    raw = np.array([(b.pawns, b.knights, b.bishops, b.rooks, b.queens, b.kings,
+                     b.occupied_co[chess.WHITE], b.occupied_co[chess.BLACK]) for b in boards], dtype=np.uint64)
+    masks = raw[:, None, :6] & raw[:, 6:, None]
+    bits = np.unpackbits(masks.astype("<u8").view(np.uint8), bitorder="little")
+    return bits.reshape(len(boards), len(_PLANES), 64)
+
+
+def evaluate_batch(boards: Iterable[chess.Board], backend: str = "auto", terminal: bool = True) -> List[int]:
+    """Оценивает пачку позиций; результат совпадает с ai.evaluate для каждой.
+
+    terminal=False пропускает проверки мата/пата/повторения и возвращает
+    только материал + PST (как ai.material_score) — это заметно быстрее.
+    """
+    boards = list(boards)
+    if backend == "auto":
+        backend = default_backend()
+    if backend == "python":
+        return [evaluate(b) if terminal else material_score(b) for b in boards]
+    if backend != "numpy":
+        raise ValueError(f"unknown backend: {backend!r} (expected one of {BACKENDS})")
+    if np is None:
+        raise RuntimeError("numpy backend requested but numpy is not installed")
+    if not boards:
+        return []
+    material = np.einsum("npq,pq->n", piece_planes(boards), _pst()).tolist()
+    if not terminal:
+        return material
+    out = []
+    for b, score in zip(boards, material):
+        term = terminal_score(b)
+        out.append(score if term is None else term)
+    return out
+
+
+def evaluate_children(board: chess.Board, backend: str = "auto", terminal: bool = True) -> List[Tuple[chess.Move, int]]:
+    """Оценки всех позиций после легальных ходов из board (узел-граница поиска)."""
+    moves = list(board.legal_moves)
+    children = []
+    for mv in moves:
+        child = board.copy()
+        child.push(mv)
+        children.append(child)
+    return list(zip(moves, evaluate_batch(children, backend, terminal)))
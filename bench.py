@@ -0,0 +1,279 @@
+import argparse
+import json
+import random
+import sys
+import time
+import chess
+from typing import Dict, List, Optional
+from ai import ChessAI, evaluate
+from difficulty import LEVELS, Difficulty
+from search_board import SearchBoard, perft
+
+# фиксированный набор позиций: id -> (категория, FEN)
+SUITE = {
+    "start":       ("opening",    chess.STARTING_FEN),
+    "italian":     ("opening",    "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    "sicilian":    ("opening",    "rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2"),
+    "kiwipete":    ("middlegame", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    "qgd":         ("middlegame", "r1bq1rk1/pp2bppp/2n1pn2/2pp4/2PP4/2N1PN2/PP2BPPP/R1BQ1RK1 w - - 0 8"),
+    "fork":        ("tactics",    "r3k2r/ppp2ppp/2n5/3q4/3P4/2N5/PPP2PPP/R2QK2R w KQkq - 0 1"),
+    "back_rank":   ("tactics",    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"),
+    "rook_ending": ("endgame",    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    "kp_ending":   ("endgame",    "8/8/4k3/8/4P3/4K3/8/8 w - - 0 1"),
+}
+# для --perft вдобавок к SUITE: превращения со взятием, рокировки, открытые шахи
+PERFT_POSITIONS = {
+    "promotions":  "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "discovered":  "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+}
+DEPTHS = (2, 3, 4)  # фиксированные глубины; уровни игры (бюджет узлов + время) — --levels
+EVAL_ITERATIONS = 2000
+REPEATS = 3          # время — лучшее из стольких прогонов (шум планировщика только замедляет)
+MIN_SECONDS = 0.2    # строки быстрее этого по времени не сравниваем: там шум больше допуска
+SELECTIVE = ("pvs", "null_move", "lmr", "check_ext")
+# включённые части выборочного поиска (--selective)
+_selective: List[str] = []
+
+
+def _engine(depth: int) -> ChessAI:
+    # книга и таблицы выключены: меряем сам поиск
+    ai = ChessAI(max_depth=depth, book_path=None, syzygy_dir=None)
+    for name in _selective:
+        setattr(ai, name, True)
+    return ai
+
+
+def _level_engine(level: Difficulty) -> ChessAI:
+    # как в main.py, но без книги, таблиц и хранилища
+    return ChessAI(max_depth=level.max_depth, book_path=None, syzygy_dir=None, selective=level.selective,
+                   node_budget=level.nodes, time_budget=level.movetime, margin=level.margin)
+
+
+def _timed(make_ai, fn, repeats: int) -> Dict:
+    """Лучший по времени из repeats прогонов, каждый — на свежем движке с тем же seed."""
+    best = None
+    for _ in range(repeats):
+        random.seed(0)
+        ai = make_ai()
+        nodes = ai.nodes + ai.qnodes
+        start = time.perf_counter()
+        result = fn(ai)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[1]:
+            best = (ai, elapsed, result, ai.nodes + ai.qnodes - nodes)
+    ai, elapsed, result, nodes = best
+    return {
+        "result": result,
+        "seconds": round(elapsed, 4),
+        "nodes": nodes,
+        "nps": round(nodes / elapsed) if elapsed > 0 else 0,
+        "stats": ai.last_stats.as_dict() if ai.last_stats else None,
+    }
+
+
+def bench_position(fen: str, depths, k: int, repeats: int = REPEATS) -> Dict:
+    out: Dict = {"choose_move": {}, "top_moves": {}}
+    for depth in depths:
+        r = _timed(lambda: _engine(depth), lambda ai: ai.choose_move(chess.Board(fen)), repeats)
+        r["result"] = r["result"].uci() if r["result"] else None
+        out["choose_move"][str(depth)] = r
+        r = _timed(lambda: _engine(depth), lambda ai: ai.top_moves(chess.Board(fen), k), repeats)
+        r["result"] = [[mv.uci(), score] for mv, score in r["result"]]
+        out["top_moves"][str(depth)] = r
+    board = chess.Board(fen)
+    elapsed = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(EVAL_ITERATIONS):
+            evaluate(board)
+        run_time = time.perf_counter() - start
+        elapsed = run_time if elapsed is None else min(elapsed, run_time)
+    out["evaluate"] = {"result": evaluate(board), "seconds": round(elapsed, 4),
+                       "evals_per_sec": round(EVAL_ITERATIONS / elapsed)}
+    return out
+
+
+def run(depths, k: int, only: Optional[List[str]] = None, repeats: int = REPEATS) -> Dict:
+    positions = {}
+    for pid, (category, fen) in SUITE.items():
+        if only and pid not in only:
+            continue
+        print(f"[bench] {pid} ({category})", file=sys.stderr)
+        positions[pid] = {"category": category, "fen": fen, **bench_position(fen, depths, k, repeats)}
+    totals = {}
+    for method in ("choose_move", "top_moves"):
+        for depth in depths:
+            rows = [p[method][str(depth)] for p in positions.values()]
+            seconds = sum(r["seconds"] for r in rows)
+            nodes = sum(r["nodes"] for r in rows)
+            totals[f"{method}@{depth}"] = {"seconds": round(seconds, 4), "nodes": nodes,
+                                            "nps": round(nodes / seconds) if seconds > 0 else 0}
+    return {"python": sys.version.split()[0], "depths": list(depths), "k": k, "repeats": repeats,
+            "selective": list(_selective),
+            "positions": positions, "totals": totals}
+
+
+def run_levels(only: Optional[List[str]] = None, repeats: int = REPEATS) -> Dict:
+    """Ход движка на каждом уровне difficulty.LEVELS: бюджет узлов, movetime и ослабление — как в игре."""
+    positions = {}
+    for pid, (category, fen) in SUITE.items():
+        if only and pid not in only:
+            continue
+        print(f"[bench] {pid} ({category})", file=sys.stderr)
+        rows = {}
+        for level in LEVELS:
+            r = _timed(lambda: _level_engine(level), lambda ai: ai.choose_move(chess.Board(fen)), repeats)
+            r["result"] = r["result"].uci() if r["result"] else None
+            # без бюджета узлов поиск останавливает время — число узлов зависит от машины
+            r["timed"] = level.nodes is None
+            rows[level.name] = r
+        positions[pid] = {"category": category, "fen": fen, "choose_move": rows}
+    totals = {}
+    for level in LEVELS:
+        rows = [p["choose_move"][level.name] for p in positions.values()]
+        seconds = sum(r["seconds"] for r in rows)
+        nodes = sum(r["nodes"] for r in rows)
+        totals[f"choose_move@{level.name}"] = {"seconds": round(seconds, 4), "nodes": nodes,
+                                                "nps": round(nodes / seconds) if seconds > 0 else 0,
+                                                "timed": level.nodes is None}
+    return {"python": sys.version.split()[0], "levels": [level.name for level in LEVELS], "repeats": repeats,
+            "positions": positions, "totals": totals}
+
+
+def _reference_perft(board: chess.Board, depth: int) -> int:
+    if depth <= 1:
+        return board.legal_moves.count() if depth else 1
+    nodes = 0
+    for mv in board.legal_moves:
+        board.push(mv)
+        nodes += _reference_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def run_perft(depth: int, only: Optional[List[str]] = None) -> Dict:
+    """Генератор ходов SearchBoard против python-chess: число листьев на глубине depth должно совпасть."""
+    fens = {pid: fen for pid, (_, fen) in SUITE.items()}
+    fens.update(PERFT_POSITIONS)
+    positions = {}
+    for pid, fen in fens.items():
+        if only and pid not in only:
+            continue
+        print(f"[perft] {pid}", file=sys.stderr)
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        expected = _reference_perft(board, depth)
+        reference_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        nodes = perft(SearchBoard(board), depth)
+        seconds = time.perf_counter() - start
+        positions[pid] = {"fen": fen, "nodes": nodes, "expected": expected, "ok": nodes == expected,
+                          "seconds": round(seconds, 4), "python_chess_seconds": round(reference_seconds, 4)}
+    return {"python": sys.version.split()[0], "perft_depth": depth,
+            "ok": all(p["ok"] for p in positions.values()), "positions": positions}
+
+
+def _slower(name: str, old: Dict, row: Dict, tolerance: float, min_seconds: float) -> List[str]:
+    problems = []
+    # узлы детерминированы (кроме поиска, который останавливает время): их рост — изменение поиска, а не шум
+    if old.get("nodes") and not row.get("timed") and row["nodes"] > old["nodes"] * (1 + tolerance):
+        problems.append(f"{name}: nodes {old['nodes']} -> {row['nodes']} "
+                        f"(+{(row['nodes'] / old['nodes'] - 1) * 100:.0f}%)")
+    if (old["seconds"] >= min_seconds and row["seconds"] >= min_seconds
+            and row["seconds"] > old["seconds"] * (1 + tolerance)):
+        problems.append(f"{name}: {old['seconds']:.3f}s -> {row['seconds']:.3f}s "
+                        f"(+{(row['seconds'] / old['seconds'] - 1) * 100:.0f}%)")
+    return problems
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float, min_seconds: float = MIN_SECONDS) -> List[str]:
+    """Регрессии относительно базового отчёта: рост числа узлов или времени больше чем на tolerance.
+
+    Время сравнивается, только если обе строки не короче min_seconds.
+    """
+    problems = []
+    for pid, pos in report["positions"].items():
+        base = baseline.get("positions", {}).get(pid)
+        if not base:
+            continue
+        for method in ("choose_move", "top_moves"):
+            for depth, row in pos.get(method, {}).items():
+                old = base.get(method, {}).get(depth)
+                if old:
+                    problems += _slower(f"{pid} {method}@{depth}", old, row, tolerance, min_seconds)
+        old, row = base.get("evaluate"), pos.get("evaluate")
+        if (old and row and old["seconds"] >= min_seconds and row["seconds"] >= min_seconds
+                and row["evals_per_sec"] * (1 + tolerance) < old["evals_per_sec"]):
+            problems.append(f"{pid} evaluate: {old['evals_per_sec']}/s -> {row['evals_per_sec']}/s")
+    for name, row in report["totals"].items():
+        old = baseline.get("totals", {}).get(name)
+        if old:
+            problems += _slower(f"TOTAL {name}", old, row, tolerance, min_seconds)
+    return problems
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Headless benchmark of ChessAI")
+    ap.add_argument("--depths", default=",".join(map(str, DEPTHS)), help="comma-separated search depths")
+    ap.add_argument("-k", type=int, default=5, help="number of lines for top_moves")
+    ap.add_argument("--only", help="comma-separated position ids from the suite")
+    ap.add_argument("--out", help="write the JSON report to this file instead of stdout")
+    ap.add_argument("--baseline", help="compare against a saved report and fail on slowdowns")
+    ap.add_argument("--save-baseline", help="also save this run as a baseline file")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed growth of nodes or time vs baseline (0.25 = 25%%)")
+    ap.add_argument("--repeats", type=int, default=REPEATS, help="timing runs per row; the fastest one is kept")
+    ap.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                    help="rows faster than this are compared by nodes only")
+    ap.add_argument("--perft", type=int, metavar="DEPTH",
+                    help="instead of benchmarking, check the search board move generator against python-chess")
+    ap.add_argument("--levels", action="store_true",
+                    help="benchmark choose_move at each GUI difficulty level (node budget + movetime)")
+    ap.add_argument("--selective", default="", help=f"selective search parts to enable: all or some of {','.join(SELECTIVE)}")
+    args = ap.parse_args(argv)
+
+    _selective[:] = SELECTIVE if args.selective == "all" else [s for s in args.selective.split(",") if s]
+    unknown = set(_selective) - set(SELECTIVE)
+    if unknown:
+        ap.error(f"unknown --selective parts: {', '.join(sorted(unknown))}")
+
+    depths = [int(d) for d in args.depths.split(",") if d]
+    only = args.only.split(",") if args.only else None
+    if args.perft is not None:
+        report = run_perft(args.perft, only)
+    elif args.levels:
+        report = run_levels(only, args.repeats)
+    else:
+        report = run(depths, args.k, only, args.repeats)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.perft is not None:
+        bad = [pid for pid, p in report["positions"].items() if not p["ok"]]
+        if bad:
+            print("PERFT MISMATCH: " + ", ".join(bad), file=sys.stderr)
+            return 1
+        print("[perft] all positions match python-chess", file=sys.stderr)
+        return 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance, args.min_seconds)
+        if problems:
+            print("REGRESSION:", file=sys.stderr)
+            for p in problems:
+                print("  " + p, file=sys.stderr)
+            return 1
+        print("[bench] no regressions vs baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import os
+import chess
+import chess.polyglot
+from typing import Optional
+
+BOOK_PATH = "assets/book.bin"  # дебютная книга в формате Polyglot
+
+
+class OpeningBook:
+    """Дебютная книга Polyglot. Если файла нет — просто всегда промахивается."""
+
+    def __init__(self, path: Optional[str] = BOOK_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._reader: Optional[chess.polyglot.MemoryMappedReader] = None
+        if path and os.path.isfile(path):
+            try:
+                self._reader = chess.polyglot.open_reader(path)
+            except Exception:
+                self._reader = None  # битый файл — играем без книги
+
+    @property
+    def available(self) -> bool:
+        return self._reader is not None
+
+    def move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Случайный ход из книги с учётом весов или None."""
+        if self._reader is None:
+            return None
+        try:
+            entry = self._reader.weighted_choice(board)
+        except IndexError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.move
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Difficulty:
+    """Уровень сложности: бюджет поиска на ход и ослабление выбора после поиска.
+
+    Время ответа ограничено movetime на любом уровне, каким бы ни был
+    размер дерева; nodes делает силу игры одинаковой на быстрых и медленных
+    машинах, пока в movetime укладывается.
+    """
+    name: str
+    nodes: Optional[int]      # бюджет узлов на ход (None — только по времени)
+    movetime: float           # жёсткий предел времени на ход, с
+    margin: int = 0           # ход выбирается среди уступающих лучшему не больше margin сантипешек
+    max_depth: int = 64       # потолок итеративного углубления
+    selective: bool = False   # PVS, null move, LMR, продление шахов
+    hint_depth: int = 3       # глубина подсказок (top_moves ищет на фиксированную глубину)
+
+
+LEVELS = [
+    Difficulty("Легко", nodes=1_500, movetime=0.3, margin=150, max_depth=3, hint_depth=2),
+    Difficulty("Средне", nodes=8_000, movetime=0.6, margin=50, max_depth=4),
+    Difficulty("Сложно", nodes=40_000, movetime=1.2, selective=True),
+    Difficulty("Очень сложно", nodes=None, movetime=2.5, selective=True, hint_depth=4),
+]
@@ -1,47 +1,89 @@
+import sys
+import threading
+import time
+from typing import Optional
+_T0 = time.perf_counter()
 import pygame
 import chess
-from ai import ChessAI
-from move_helper import MoveHelper
-from ui import UI
-from tips import top_tips
+from ui import UI, BOARD_AREA, PANEL_AREA
+
+DEBUG_REFRESH = 0.25  # сек: живую статистику во время поиска обновляем не каждый кадр
+
+def _preload_engine(timings: dict):
+    # модули движка грузятся в фоне, пока на экране меню сложности
+    start = time.perf_counter()
+    import ai, move_helper, position_store, search_service, tips  # noqa: F401
+    timings["импорт движка (фон)"] = time.perf_counter() - start
 
 def main():
+    timings = {"import pygame+ui": time.perf_counter() - _T0}
+    preload = threading.Thread(target=_preload_engine, args=(timings,), name="engine-preload", daemon=True)
+    preload.start()
+    start = time.perf_counter()
     ui = UI()
-    label, depth, rand = ui.prompt_menu()
+    timings["окно и шрифты"] = time.perf_counter() - start
+    level = ui.prompt_menu()
+    label = level.name
     play_white = ui.prompt_side()
 
-    ai = ChessAI(max_depth=depth, randomness=rand)
-    helper = MoveHelper(ai)
+    start = time.perf_counter()
+    preload.join()
+    from ai import ChessAI
+    from move_helper import MoveHelper
+    from position_store import STORE_PATH
+    from search_service import HintService, SearchService
+    from tips import format_tips
+    # ходы ИИ и подсказки берут уже посчитанное в прошлых партиях из общей базы на диске
+    # сила уровня — бюджет узлов и ослабление после поиска, время ответа ограничено movetime
+    ai = ChessAI(max_depth=level.max_depth, store_path=STORE_PATH, selective=level.selective,
+                 node_budget=level.nodes, time_budget=level.movetime, margin=level.margin)
+    # ИИ думает в фоновом потоке со своим экземпляром движка, подсказки считает отдельный;
+    # пока ходит человек, движок уже ищет ответ на ожидаемый ход
+    engine = SearchService(ai, ponder=True)
+    hint_ai = ChessAI(max_depth=level.hint_depth, store_path=STORE_PATH, selective=level.selective)
+    # подсказки тоже считаются в своём потоке: кадр показывает их, когда они готовы
+    hinter = HintService(MoveHelper(hint_ai))
+    timings["ожидание движка после меню"] = time.perf_counter() - start
 
     white_bottom = play_white
     board = chess.Board()
     selected = None
     show_hints = False
+    show_debug = False
     legal_targets = []
     last_move = None
     clock = pygame.time.Clock()
+    # что было нарисовано в прошлый раз: кадр без изменений не рисуется вовсе
+    drawn_board = drawn_panel = None
+    live_debug, live_at = None, 0.0
 
     if not play_white:
-        ai_move = ai.choose_move(board)
-        if ai_move:
-            board.push(ai_move)
-            last_move = ai_move
+        engine.start(board)
 
     while True:
+        ai_mv = engine.poll()
+        if ai_mv and ai_mv in board.legal_moves:
+            board.push(ai_mv)
+            last_move = ai_mv
+
         for e in pygame.event.get():
             if e.type == pygame.QUIT:
-                pygame.quit(); raise SystemExit
+                engine.close(); hinter.close(); pygame.quit(); raise SystemExit
+            if e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                drawn_board = drawn_panel = None
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_ESCAPE:
-                    pygame.quit(); raise SystemExit
+                    engine.close(); hinter.close(); pygame.quit(); raise SystemExit
                 if e.key == pygame.K_h:
                     show_hints = not show_hints
+                if e.key == pygame.K_d:
+                    show_debug = not show_debug
             if e.type == pygame.MOUSEBUTTONDOWN and e.button == 1:
                 if ui.button_rect.collidepoint(e.pos):
                     show_hints = not show_hints
                     continue
                 sq = ui.mouse_to_square(e.pos, white_bottom)
-                if sq is None:
+                if sq is None or engine.busy:
                     continue
                 if selected is None:
                     p = board.piece_at(sq)
@@ -56,39 +98,74 @@ def main():
                         selected = None
                         legal_targets = []
                         if not board.is_game_over():
-                            ai_mv = ai.choose_move(board)
-                            if ai_mv:
-                                board.push(ai_mv)
-                                last_move = ai_mv
+                            engine.start(board)
                     else:
                         selected = None
                         legal_targets = []
 
-        ui.draw_board(
-            board,
-            selected,
-            legal_targets,
-            [m[0].to_square for m in helper.suggestions(board)] if show_hints and not board.is_game_over() else [],
-            last_move,
-            white_bottom
-        )
-        main_text = status_text(board, label, show_hints)
-        sub_text = last_move_text(board)
-        tips = top_tips(board, ai, 5) if show_hints and not board.is_game_over() else []
-        ui.draw_panel(main_text, sub_text, show_hints, tips)
-        pygame.display.flip()
+        hints_on = show_hints and not engine.busy and not board.is_game_over()
+        if hints_on:
+            suggestions = hinter.request(board) or []
+        else:
+            hinter.cancel()
+            suggestions = []
+        hints = [m.to_square for m, _ in suggestions]
+        main_text = status_text(board, label, show_hints, engine.busy)
+        sub_text = last_move_text(board, None if engine.busy else engine.last_time, engine.last_ponder_hit)
+        tips = format_tips(board, suggestions)
+        debug = None
+        if show_debug and engine.busy:
+            # пока ИИ думает — живые счётчики из фонового потока, не чаще раза в DEBUG_REFRESH
+            if live_debug is None or time.monotonic() - live_at >= DEBUG_REFRESH:
+                live_debug, live_at = ai.stats_snapshot().summary_lines(), time.monotonic()
+            debug = live_debug
+        elif show_debug:
+            live_debug = None
+            debug = ai.last_stats.summary_lines() if ai.last_stats else ["статистики пока нет"]
+
+        # оверлей статистики лежит поверх доски, поэтому входит в состояние обеих областей
+        board_state = (board.fen(), selected, tuple(legal_targets), tuple(hints), last_move, white_bottom,
+                       tuple(debug or ()))
+        panel_state = (main_text, sub_text, show_hints, tuple(tips), tuple(debug or ()))
+        dirty = []
+        if board_state != drawn_board:
+            ui.draw_board(board, selected, legal_targets, hints, last_move, white_bottom)
+            drawn_board = board_state
+            dirty.append(BOARD_AREA)
+        if panel_state != drawn_panel or dirty:
+            ui.draw_panel(main_text, sub_text, show_hints, tips, debug)
+            drawn_panel = panel_state
+            dirty.append(PANEL_AREA)
+        if dirty:
+            pygame.display.update(dirty)
+            if "первый кадр доски" not in timings:
+                timings["первый кадр доски"] = time.perf_counter() - start
+                if "--startup-times" in sys.argv:
+                    report_startup(timings, ui.first_frame_at)
         clock.tick(60)
 
+def report_startup(timings: dict, menu_shown_at) -> None:
+    """Разбивка времени запуска (python main.py --startup-times)."""
+    if menu_shown_at is not None:
+        print(f"[startup] меню на экране через {(menu_shown_at - _T0) * 1000:.0f} мс", file=sys.stderr)
+    for name, sec in timings.items():
+        print(f"[startup]   {name}: {sec * 1000:.0f} мс", file=sys.stderr)
+
 def move_to_alg(m: chess.Move) -> str:
     return f"{chess.square_name(m.from_square)}→{chess.square_name(m.to_square)}" + (f"={chess.piece_symbol(m.promotion).upper()}" if m.promotion else "")
 
-def last_move_text(board: chess.Board) -> str:
+def last_move_text(board: chess.Board, ai_time: Optional[float] = None, predicted: bool = False) -> str:
     if board.move_stack:
         last = board.peek()
-        return f"Последний ход: {move_to_alg(last)}"
+        text = f"Последний ход: {move_to_alg(last)}"
+        if ai_time:
+            text += f"  •  ИИ думал {ai_time:.2f} с"
+            if predicted:
+                text += " (ваш ход угадан заранее)"
+        return text
     return "Последний ход: —"
 
-def status_text(board: chess.Board, label: str, show_hints: bool) -> str:
+def status_text(board: chess.Board, label: str, show_hints: bool, thinking: bool = False) -> str:
     if board.is_checkmate():
         return "Мат. Вы выиграли!" if not board.turn else "Мат. ИИ победил."
     if board.is_stalemate():
@@ -98,6 +175,8 @@ def status_text(board: chess.Board, label: str, show_hints: bool) -> str:
     base = f"Ход: {'Белые' if board.turn else 'Чёрные'}  •  Сложность: {label}  •  Подсказки: {'ВКЛ' if show_hints else 'ВЫКЛ'}"
     if board.is_check():
         base += "  •  Шах!"
+    if thinking:
+        base += "  •  ИИ думает…"
     return base
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 import chess
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from ai import ChessAI
+from analysis_cache import AnalysisCache
 
 class MoveHelper:
-    def __init__(self, ai: ChessAI):
+    def __init__(self, ai: ChessAI, cache: Optional[AnalysisCache] = None):
         self.ai = ai
+        self.cache = cache or AnalysisCache(ai)
 
     def suggestions(self, board: chess.Board, k: int = 5) -> List[Tuple[chess.Move, int]]:
-        return self.ai.top_moves(board, k)
+        return self.cache.top_moves(board, k)
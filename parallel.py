@@ -0,0 +1,166 @@
+import math
+import multiprocessing
+import os
+import chess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from ai import ChessAI, _SearchAborted
+from book import BOOK_PATH
+from tablebase import SYZYGY_DIR
+
+# движок процесса-воркера: живёт, пока жив пул, вместе со своей таблицей транспозиций
+_worker_ai: Optional[ChessAI] = None
+
+
+def _init_worker(tt_size_mb: float, stop_event, selective: Tuple[bool, ...] = (False,) * 4,
+                 quiescence: bool = True, book_path: Optional[str] = BOOK_PATH,
+                 syzygy_dir: Optional[str] = SYZYGY_DIR):
+    global _worker_ai
+    _worker_ai = ChessAI(tt_size_mb=tt_size_mb, quiescence=quiescence, book_path=book_path, syzygy_dir=syzygy_dir)
+    _worker_ai._stop = stop_event
+    _worker_ai.pvs, _worker_ai.null_move, _worker_ai.lmr, _worker_ai.check_ext = selective
+
+
+def _search_move(board: chess.Board, depth: int, mv: chess.Move, alpha: float, deadline: Optional[float],
+                 node_limit: Optional[int], generation: int
+                 ) -> Tuple[Optional[int], List[chess.Move], bool, Tuple[int, ...]]:
+    ai = _worker_ai
+    ai.tt.generation = generation
+    ai._deadline = deadline
+    ai._history_draw = False
+    before = _worker_counters(ai)
+    # остаток бюджета узлов родителя: больше него один корневой ход не потратит
+    ai._node_deadline = before[0] + before[1] + node_limit if node_limit is not None else None
+    pv: List[chess.Move] = []
+    try:
+        score = ai._search_root(board, depth, [mv], alpha)[0][1]
+        # главный вариант — только из таблицы воркера: у родителя она пуста
+        pv = ai._principal_variation(board, mv, depth)
+    except _SearchAborted:
+        score = None
+    finally:
+        ai._deadline = None
+        ai._node_deadline = None
+    return score, pv, ai._history_draw, tuple(b - a for a, b in zip(before, _worker_counters(ai)))
+
+
+def _worker_counters(ai: ChessAI) -> Tuple[int, ...]:
+    return (ai.nodes, ai.qnodes, ai.leaf_evals, ai.cutoffs, ai.first_cutoffs,
+            ai.tt.probes, ai.tt.hits, ai.tablebase.hits, ai.tablebase.misses)
+
+
+class ParallelChessAI(ChessAI):
+    """ChessAI, который делит корневые ходы между процессами.
+
+    Каждый корневой ход — отдельная задача для пула, так что загрузка
+    выравнивается сама. Оценки совпадают с однопоточным поиском: корневые
+    ходы ищутся с тем же окном. Таблица транспозиций у каждого воркера
+    своя (tt_size_mb — на процесс) и сохраняется между ходами партии.
+    Настройки поиска (quiescence, выборочный поиск, книга, таблицы) воркеры
+    получают от родителя; бюджет узлов общий на все корневые ходы.
+    """
+
+    def __init__(self, max_depth: int = 3, tt_size_mb: float = 16,
+                 workers: Optional[int] = None, selective: bool = False,
+                 quiescence: bool = True, book_path: Optional[str] = BOOK_PATH,
+                 syzygy_dir: Optional[str] = SYZYGY_DIR, store_path: Optional[str] = None,
+                 node_budget: Optional[int] = None, time_budget: Optional[float] = None, margin: int = 0):
+        super().__init__(max_depth, tt_size_mb, quiescence, book_path, syzygy_dir, store_path,
+                         selective, node_budget, time_budget, margin)
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_size_mb = tt_size_mb
+        self.book_path = book_path
+        self.syzygy_dir = syzygy_dir
+        self._mp_stop = multiprocessing.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # главные варианты корневых ходов от воркеров, для позиции _pv_fen
+        self._root_pvs: Dict[chess.Move, List[chess.Move]] = {}
+        self._pv_fen: Optional[str] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def new_game(self):
+        super().new_game()
+        self.close()  # воркеры перезапустятся с пустыми таблицами
+
+    def stop(self):
+        super().stop()
+        self._mp_stop.set()
+
+    def _search_multipv(self, board: chess.Board, depth: int, k: int) -> List[Tuple[chess.Move, int]]:
+        if self.workers <= 1 or k <= 0:
+            return super()._search_multipv(board, depth, k)
+        # параллельно границу нельзя сужать после каждого хода: сначала k ходов
+        # с полным окном, затем остальные — все сразу с окном от k-й оценки
+        moves = self._ordered_moves(board)
+        best = self._search_root(board, depth, moves[:k])
+        if len(moves) > k:
+            bound = min(score for _, score in best)
+            best += [(mv, sc) for mv, sc in self._search_root(board, depth, moves[k:], bound) if sc > bound]
+        best.sort(key=lambda x: x[1], reverse=True)
+        return best[:k]
+
+    def _search_root(self, board: chess.Board, depth: int, order: Optional[List[chess.Move]] = None,
+                     alpha: float = -math.inf, margin: Optional[int] = None) -> List[Tuple[chess.Move, int]]:
+        moves = order if order is not None else self._ordered_moves(board)
+        if self._pv_fen != board.fen():
+            self._root_pvs, self._pv_fen = {}, board.fen()
+        if self.workers <= 1 or len(moves) <= 1:
+            for mv in moves:
+                self._root_pvs.pop(mv, None)  # вариант будет в своей таблице
+            return super()._search_root(board, depth, moves, alpha, margin)
+        # корневые ходы ищутся одновременно, так что границу от лучшего хода (margin) не поднять
+        if self._out_of_budget():
+            raise _SearchAborted
+        self._mp_stop.clear()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(self.tt_size_mb, self._mp_stop,
+                                                       (self.pvs, self.null_move, self.lmr, self.check_ext),
+                                                       self.quiescence, self.book_path, self.syzygy_dir))
+        node_limit = (self._node_deadline - self.nodes - self.qnodes) if self._node_deadline is not None else None
+        futures = [self._pool.submit(_search_move, board, depth, mv, alpha, self._deadline, node_limit,
+                                     self.tt.generation)
+                   for mv in moves]
+        out = []
+        aborted = False
+        for mv, fut in zip(moves, futures):
+            if aborted:
+                fut.cancel()
+                continue
+            score, pv, history_draw, counters = fut.result()
+            self._history_draw |= history_draw
+            # счётчики воркеров складываем в свои, чтобы статистика поиска была общей
+            self.nodes += counters[0]
+            self.qnodes += counters[1]
+            self.leaf_evals += counters[2]
+            self.cutoffs += counters[3]
+            self.first_cutoffs += counters[4]
+            self.tt.probes += counters[5]
+            self.tt.hits += counters[6]
+            self.tablebase.hits += counters[7]
+            self.tablebase.misses += counters[8]
+            if score is None or self._out_of_budget():
+                aborted = True
+                self._mp_stop.set()  # бюджет кончился — остальные воркеры тоже бросают поиск
+            if score is not None:
+                out.append((mv, score))
+                self._root_pvs[mv] = pv
+        if aborted:
+            raise _SearchAborted
+        return out
+
+    def _principal_variation(self, board: chess.Board, first: chess.Move, depth: int) -> List[chess.Move]:
+        pv = self._root_pvs.get(first) if board.fen() == self._pv_fen else None
+        if pv:
+            return pv[:depth]
+        return super()._principal_variation(board, first, depth)
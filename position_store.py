@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import chess
+from typing import List, Optional, Tuple
+from transposition import zobrist_key
+
+CACHE_DIR = os.environ.get("CHESSAI_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "chessai"))
+STORE_PATH = os.path.join(CACHE_DIR, "positions.sqlite")
+MAX_ENTRIES = 200_000
+EVICT_EVERY = 256  # как часто (в записях) проверять размер базы
+
+Line = Tuple[List[chess.Move], int]
+
+
+class PositionStore:
+    """Результаты поиска на диске (SQLite): хеш позиции -> глубина, варианты с оценками.
+
+    Переживает перезапуск, так что частые позиции отвечаются без поиска.
+    На позицию хранится одна запись — самая глубокая. Вместе с вариантами
+    хранятся настройки поиска (config) и margin — насколько хуже лучшего хода
+    оценки ещё точные: чужие настройки или меньший margin — промах. Сверх max_entries
+    вытесняются давно не читанные. Базу могут одновременно открывать
+    несколько процессов (WAL); если она занята или сломана, запись
+    просто пропускается. Без пути — всегда промахивается.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                with self._db:
+                    columns = {row[1] for row in self._db.execute("PRAGMA table_info(positions)")}
+                    if columns and "config" not in columns:
+                        # записи старого формата не знают, с какими настройками искались
+                        self._db.execute("DROP TABLE positions")
+                    self._db.execute("CREATE TABLE IF NOT EXISTS positions ("
+                                     "key INTEGER PRIMARY KEY, depth INTEGER NOT NULL, complete INTEGER NOT NULL, "
+                                     "margin INTEGER NOT NULL, config TEXT NOT NULL, "
+                                     "lines TEXT NOT NULL, used REAL NOT NULL)")
+                    self._db.execute("CREATE INDEX IF NOT EXISTS positions_used ON positions(used)")
+            except (OSError, sqlite3.Error):
+                self._db = None  # без хранилища движок работает как раньше
+
+    @property
+    def available(self) -> bool:
+        return self._db is not None
+
+    @staticmethod
+    def _key(board: chess.Board) -> int:
+        # SQLite хранит знаковые 64-битные целые
+        key = zobrist_key(board)
+        return key - (1 << 64) if key >= 1 << 63 else key
+
+    def lookup(self, board: chess.Board, depth: int, k: int = 1, margin: Optional[int] = None,
+               config: str = "") -> Optional[List[Line]]:
+        """Варианты (лучший — первый), если позиция искалась не мельче depth с теми же настройками,
+        вариантов хватает на k и (если margin задан) точны все ходы в пределах margin от лучшего."""
+        if self._db is None:
+            return None
+        key = self._key(board)
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT depth, complete, lines, margin, config FROM positions WHERE key = ?",
+                                       (key,)).fetchone()
+                if (row is None or row[0] < depth or row[4] != config
+                        or (not row[1] and (len(json.loads(row[2])) < k or (margin is not None and row[3] < margin)))):
+                    self.misses += 1
+                    return None
+                with self._db:
+                    self._db.execute("UPDATE positions SET used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            self.misses += 1
+            return None
+        lines = []
+        for score, pv in json.loads(row[2]):
+            moves = [chess.Move.from_uci(u) for u in pv.split()]
+            if not moves or not board.is_legal(moves[0]):
+                self.misses += 1  # коллизия хеша
+                return None
+            lines.append((moves, score))
+        self.hits += 1
+        return lines
+
+    def save(self, board: chess.Board, depth: int, lines: List[Line], complete: bool = False,
+             margin: int = 0, config: str = ""):
+        """Записывает результат, если он глубже (или при той же глубине — полнее) сохранённого.
+
+        complete — в lines все легальные ходы позиции; иначе в lines все ходы,
+        уступающие лучшему не больше margin. config — настройки поиска.
+        """
+        if self._db is None or not lines:
+            return
+        key = self._key(board)
+        lines = sorted(lines, key=lambda x: x[1], reverse=True)
+        payload = json.dumps([[score, " ".join(m.uci() for m in pv)] for pv, score in lines], separators=(",", ":"))
+        try:
+            with self._lock, self._db:
+                row = self._db.execute("SELECT depth, complete, lines FROM positions WHERE key = ?",
+                                       (key,)).fetchone()
+                if row is not None and (row[0], row[1], len(json.loads(row[2]))) >= (depth, int(complete), len(lines)):
+                    return
+                self._db.execute("INSERT OR REPLACE INTO positions (key, depth, complete, margin, config, lines, used) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (key, depth, int(complete), margin, config, payload, time.time()))
+                self._writes += 1
+                if self._writes % min(EVICT_EVERY, max(1, self.max_entries // 10)) == 0:
+                    self._evict()
+        except sqlite3.Error:
+            pass  # база занята другим процессом дольше таймаута — результат просто не сохранится
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        if count > self.max_entries:
+            # с запасом в 10%, чтобы не чистить на каждой следующей записи
+            excess = count - int(self.max_entries * 0.9)
+            self._db.execute("DELETE FROM positions WHERE key IN "
+                             "(SELECT key FROM positions ORDER BY used LIMIT ?)", (excess,))
+
+    def __len__(self) -> int:
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
@@ -0,0 +1,555 @@
+import chess
+from typing import Dict, List, Optional
+from transposition import _RANDOM, _TURN_KEY
+
+# Доска для поиска: почтовый ящик 10x12 (a1 = 21, ход вперёд = +10), по краям — рамка OFF,
+# поэтому выход за доску ловится одной проверкой. Фигура — тип python-chess со знаком
+# цвета (белые — плюс). Ход — целое: откуда | куда << 7 | превращение << 14 | флаг << 17.
+EMPTY, OFF = 0, 100
+EP_FLAG, CASTLE_FLAG, DOUBLE_FLAG = 1, 2, 4
+
+SQ120 = [21 + (sq & 7) + (sq >> 3) * 10 for sq in chess.SQUARES]
+SQ64 = [-1] * 120
+for _sq, _s120 in enumerate(SQ120):
+    SQ64[_s120] = _sq
+
+# направления — по убыванию индекса, как python-chess перебирает клетки (от h8 к a1):
+# при равной истории тихие ходы идут примерно в прежнем порядке
+KNIGHT_STEPS = (21, 19, 12, 8, -8, -12, -19, -21)
+KING_STEPS = (11, 10, 9, 1, -1, -9, -10, -11)
+DIAGONAL = (11, 9, -9, -11)
+ORTHOGONAL = (10, 1, -1, -10)
+SLIDES = {chess.BISHOP: DIAGONAL, chess.ROOK: ORTHOGONAL, chess.QUEEN: DIAGONAL + ORTHOGONAL}
+STEPS = {chess.KNIGHT: KNIGHT_STEPS, chess.KING: KING_STEPS, **SLIDES}
+WHITE_PIECES = frozenset(range(1, 7))
+BLACK_PIECES = frozenset(range(-6, 0))
+PROMOTIONS = (chess.QUEEN, chess.KNIGHT, chess.ROOK, chess.BISHOP)
+# направление луча от короля к клетке (по разности индексов + 119), 0 — не на одной линии
+RAY = [0] * 239
+for _d in DIAGONAL + ORTHOGONAL:
+    for _n in range(1, 8):
+        RAY[_n * _d + 119] = _d
+
+# права рокировки битами: белые O-O, белые O-O-O, чёрные O-O, чёрные O-O-O (как в Polyglot)
+WK, WQ, BK, BQ = 1, 2, 4, 8
+E1, G1, C1, H1, A1 = SQ120[chess.E1], SQ120[chess.G1], SQ120[chess.C1], SQ120[chess.H1], SQ120[chess.A1]
+E8, G8, C8, H8, A8 = SQ120[chess.E8], SQ120[chess.G8], SQ120[chess.C8], SQ120[chess.H8], SQ120[chess.A8]
+# ход с клетки или на клетку оставляет только эти права
+CASTLE_MASK = [15] * 120
+CASTLE_MASK[E1], CASTLE_MASK[H1], CASTLE_MASK[A1] = 15 & ~(WK | WQ), 15 & ~WK, 15 & ~WQ
+CASTLE_MASK[E8], CASTLE_MASK[H8], CASTLE_MASK[A8] = 15 & ~(BK | BQ), 15 & ~BK, 15 & ~BQ
+# ладья при рокировке: клетка короля после хода -> (откуда, куда)
+CASTLE_ROOK = {G1: (H1, G1 - 1), C1: (A1, C1 + 1), G8: (H8, G8 - 1), C8: (A8, C8 + 1)}
+
+# Zobrist-ключи Polyglot, как у transposition.zobrist_key: [фигура + 6][клетка 0..119]
+Z_PIECE = [[0] * 120 for _ in range(13)]
+for _pt in range(1, 7):
+    for _sq in chess.SQUARES:
+        Z_PIECE[6 + _pt][SQ120[_sq]] = _RANDOM[64 * ((_pt - 1) * 2 + 1) + _sq]
+        Z_PIECE[6 - _pt][SQ120[_sq]] = _RANDOM[64 * ((_pt - 1) * 2) + _sq]
+Z_CASTLE = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            Z_CASTLE[_rights] ^= _RANDOM[768 + _bit]
+Z_EP_FILE = _RANDOM[772:780]
+
+
+def pst_table(pst: Dict[int, List[int]]) -> List[List[int]]:
+    """{фигура со знаком: значения по клеткам 0..63} -> таблица SearchBoard [фигура + 6][клетка 0..119]."""
+    table = [[0] * 120 for _ in range(13)]
+    for piece, values in pst.items():
+        for sq, value in enumerate(values):
+            table[6 + piece][SQ120[sq]] = value
+    return table
+
+
+_NO_PST = pst_table({})
+
+
+def _square_colour(s: int) -> int:
+    sq = SQ64[s]
+    return ((sq >> 3) + (sq & 7)) & 1
+
+
+class SearchBoard:
+    """Позиция только для поиска: ход делается и отменяется на месте, без копий доски.
+
+    Строится из chess.Board в корне; ходы генерируются псевдолегальными, легальность
+    проверяет make (свой король под боем — ход отменяется). Ключ совпадает с
+    zobrist_key, материал + PST (по таблице pst, белые — плюс) ведётся по разнице.
+    """
+
+    __slots__ = ("sq", "white", "castling", "ep", "ep_key", "halfmove", "key", "score",
+                 "kings", "pieces", "pst", "undo")
+
+    def __init__(self, board: chess.Board, pst: Optional[List[List[int]]] = None):
+        self.pst = pst if pst is not None else _NO_PST
+        self.sq = [OFF] * 120
+        self.pieces = (set(), set())  # клетки фигур: [0] — белые, [1] — чёрные
+        self.kings = [0, 0]
+        self.score = 0
+        key = 0
+        for sq, piece in board.piece_map().items():
+            s, p = SQ120[sq], piece.piece_type if piece.color else -piece.piece_type
+            self.sq[s] = p
+            self.pieces[p < 0].add(s)
+            if piece.piece_type == chess.KING:
+                self.kings[p < 0] = s
+            self.score += self.pst[6 + p][s]
+            key ^= Z_PIECE[6 + p][s]
+        for sq in chess.SQUARES:
+            if board.piece_type_at(sq) is None:
+                self.sq[SQ120[sq]] = EMPTY
+        self.white = board.turn == chess.WHITE
+        self.castling = ((WK if board.has_kingside_castling_rights(chess.WHITE) else 0)
+                         | (WQ if board.has_queenside_castling_rights(chess.WHITE) else 0)
+                         | (BK if board.has_kingside_castling_rights(chess.BLACK) else 0)
+                         | (BQ if board.has_queenside_castling_rights(chess.BLACK) else 0))
+        self.ep = SQ120[board.ep_square] if board.ep_square is not None else 0
+        self.ep_key = self._ep_key(self.ep)
+        self.halfmove = board.halfmove_clock
+        self.key = key ^ Z_CASTLE[self.castling] ^ self.ep_key ^ (_TURN_KEY if self.white else 0)
+        self.undo: List[tuple] = []
+
+    # --- ходы ---
+
+    def _ep_key(self, ep: int) -> int:
+        # как в Polyglot: поле en passant входит в ключ, только если рядом есть пешка, готовая бить
+        if not ep:
+            return 0
+        pawn = 1 if self.white else -1
+        behind = ep - 10 if self.white else ep + 10
+        if self.sq[behind - 1] == pawn or self.sq[behind + 1] == pawn:
+            return Z_EP_FILE[SQ64[ep] & 7]
+        return 0
+
+    def make(self, m: int, in_check: bool = True) -> bool:
+        """Делает ход. Если после него свой король под боем — отменяет и возвращает False.
+
+        in_check=False — сторона не под шахом (узнать это вызывающему обычно дёшево):
+        тогда ход обычной фигуры проверяется только на связку по линии с королём.
+        """
+        frm, to, promo, flag = m & 127, m >> 7 & 127, m >> 14 & 7, m >> 17
+        sq = self.sq
+        p, cap = sq[frm], sq[to]
+        reset = cap or p == 1 or p == -1
+        white = self.white
+        us = not white  # индекс в pieces/kings: 0 — белые
+        self.undo.append((m, cap, self.castling, self.ep, self.ep_key, self.halfmove, self.key, self.score))
+        zp, pst = Z_PIECE, self.pst
+        key = self.key ^ self.ep_key ^ Z_CASTLE[self.castling] ^ _TURN_KEY
+        score = self.score - pst[6 + p][frm]
+        key ^= zp[6 + p][frm]
+        sq[frm] = EMPTY
+        own = self.pieces[us]
+        own.discard(frm)
+        if cap:
+            self.pieces[white].discard(to)
+            score -= pst[6 + cap][to]
+            key ^= zp[6 + cap][to]
+        if promo:
+            p = promo if white else -promo
+        sq[to] = p
+        own.add(to)
+        score += pst[6 + p][to]
+        key ^= zp[6 + p][to]
+        if flag & EP_FLAG:
+            victim = to - 10 if white else to + 10
+            cap = sq[victim]
+            sq[victim] = EMPTY
+            self.pieces[white].discard(victim)
+            score -= pst[6 + cap][victim]
+            key ^= zp[6 + cap][victim]
+        elif flag & CASTLE_FLAG:
+            r_from, r_to = CASTLE_ROOK[to]
+            rook = sq[r_from]
+            sq[r_from], sq[r_to] = EMPTY, rook
+            own.discard(r_from)
+            own.add(r_to)
+            score += pst[6 + rook][r_to] - pst[6 + rook][r_from]
+            key ^= zp[6 + rook][r_from] ^ zp[6 + rook][r_to]
+        king_move = p == 6 or p == -6
+        if king_move:
+            self.kings[us] = to
+        self.castling &= CASTLE_MASK[frm] & CASTLE_MASK[to]
+        self.halfmove = 0 if reset else self.halfmove + 1
+        self.white = not white
+        if flag & DOUBLE_FLAG:
+            self.ep = (frm + to) >> 1
+            self.ep_key = self._ep_key(self.ep)
+        else:
+            self.ep = self.ep_key = 0
+        self.key = key ^ self.ep_key ^ Z_CASTLE[self.castling]
+        self.score = score
+        king = self.kings[us]
+        if in_check or king_move or flag & EP_FLAG:
+            legal = not self.attacked(king, not white)
+        else:
+            legal = self._unpinned(king, frm, white)
+        if not legal:
+            self.unmake()
+        return legal
+
+    def _unpinned(self, king: int, frm: int, white: bool) -> bool:
+        # ушедшая фигура могла открыть линию на короля только вдоль луча король -> frm
+        d = RAY[frm - king + 119]
+        if not d:
+            return True
+        sq = self.sq
+        t = king + d
+        while sq[t] == EMPTY:
+            t += d
+        p = sq[t]
+        if p == OFF or (p > 0) == white:
+            return True
+        p = -p if white else p
+        return p != chess.QUEEN and p != (chess.ROOK if d in ORTHOGONAL else chess.BISHOP)
+
+    def unmake(self):
+        m, cap, self.castling, self.ep, self.ep_key, self.halfmove, self.key, self.score = self.undo.pop()
+        frm, to, promo, flag = m & 127, m >> 7 & 127, m >> 14 & 7, m >> 17
+        self.white = white = not self.white
+        us = not white
+        sq = self.sq
+        p = sq[to]
+        if promo:
+            p = 1 if white else -1
+        sq[frm], sq[to] = p, cap
+        own = self.pieces[us]
+        own.discard(to)
+        own.add(frm)
+        if cap:
+            self.pieces[white].add(to)
+        if p == 6 or p == -6:
+            self.kings[us] = frm
+        if flag & EP_FLAG:
+            victim = to - 10 if white else to + 10
+            sq[victim] = -1 if white else 1
+            self.pieces[white].add(victim)
+        elif flag & CASTLE_FLAG:
+            r_from, r_to = CASTLE_ROOK[to]
+            sq[r_from], sq[r_to] = sq[r_to], EMPTY
+            own.discard(r_to)
+            own.add(r_from)
+
+    def make_null(self):
+        """Пропуск хода (для null-move pruning)."""
+        self.undo.append((None, 0, self.castling, self.ep, self.ep_key, self.halfmove, self.key, self.score))
+        self.key ^= self.ep_key ^ _TURN_KEY
+        self.ep = self.ep_key = 0
+        self.halfmove += 1
+        self.white = not self.white
+
+    def unmake_null(self):
+        _, _, self.castling, self.ep, self.ep_key, self.halfmove, self.key, self.score = self.undo.pop()
+        self.white = not self.white
+
+    @property
+    def last_null(self) -> bool:
+        return bool(self.undo) and self.undo[-1][0] is None
+
+    # --- атаки ---
+
+    def attacked(self, s: int, by_white: bool) -> bool:
+        sq = self.sq
+        c = 1 if by_white else -1
+        # пешки бьют вперёд по диагонали: ищем их позади клетки
+        if sq[s - 9 * c] == c or sq[s - 11 * c] == c:
+            return True
+        knight, king = 2 * c, 6 * c
+        for d in KNIGHT_STEPS:
+            if sq[s + d] == knight:
+                return True
+        for d in KING_STEPS:
+            if sq[s + d] == king:
+                return True
+        bishop, rook, queen = 3 * c, 4 * c, 5 * c
+        for d in DIAGONAL:
+            t = s + d
+            while sq[t] == EMPTY:
+                t += d
+            if sq[t] == bishop or sq[t] == queen:
+                return True
+        for d in ORTHOGONAL:
+            t = s + d
+            while sq[t] == EMPTY:
+                t += d
+            if sq[t] == rook or sq[t] == queen:
+                return True
+        return False
+
+    def in_check(self) -> bool:
+        return self.attacked(self.kings[not self.white], not self.white)
+
+    # --- генерация ---
+
+    def tactical_moves(self) -> List[int]:
+        """Псевдолегальные взятия (с en passant) и все превращения."""
+        sq = self.sq
+        white = self.white
+        enemy = BLACK_PIECES if white else WHITE_PIECES
+        out = []
+        add = out.append
+        for frm in self.pieces[not white]:
+            pt = sq[frm]
+            if pt < 0:
+                pt = -pt
+            if pt == 1:
+                fwd = 10 if white else -10
+                last = SQ64[frm] >> 3 == (6 if white else 1)
+                for to in (frm + fwd - 1, frm + fwd + 1):
+                    if sq[to] in enemy:
+                        if last:
+                            out.extend(frm | to << 7 | pr << 14 for pr in PROMOTIONS)
+                        else:
+                            add(frm | to << 7)
+                    elif to == self.ep:
+                        add(frm | to << 7 | EP_FLAG << 17)
+                if last and sq[frm + fwd] == EMPTY:
+                    to = frm + fwd
+                    out.extend(frm | to << 7 | pr << 14 for pr in PROMOTIONS)
+            elif pt == 2 or pt == 6:
+                for d in STEPS[pt]:
+                    if sq[frm + d] in enemy:
+                        add(frm | (frm + d) << 7)
+            else:
+                for d in STEPS[pt]:
+                    to = frm + d
+                    while sq[to] == EMPTY:
+                        to += d
+                    if sq[to] in enemy:
+                        add(frm | to << 7)
+        return out
+
+    def quiet_moves(self) -> List[int]:
+        """Псевдолегальные тихие ходы: на пустые клетки, без превращений, с рокировками."""
+        sq = self.sq
+        white = self.white
+        out = []
+        add = out.append
+        for frm in self.pieces[not white]:
+            pt = sq[frm]
+            if pt < 0:
+                pt = -pt
+            if pt == 1:
+                fwd = 10 if white else -10
+                rank = SQ64[frm] >> 3
+                if rank == (6 if white else 1) or sq[frm + fwd] != EMPTY:
+                    continue
+                add(frm | (frm + fwd) << 7)
+                if rank == (1 if white else 6) and sq[frm + 2 * fwd] == EMPTY:
+                    add(frm | (frm + 2 * fwd) << 7 | DOUBLE_FLAG << 17)
+            elif pt == 2 or pt == 6:
+                for d in STEPS[pt]:
+                    if sq[frm + d] == EMPTY:
+                        add(frm | (frm + d) << 7)
+            else:
+                for d in STEPS[pt]:
+                    to = frm + d
+                    while sq[to] == EMPTY:
+                        add(frm | to << 7)
+                        to += d
+        self._castling_moves(out)
+        return out
+
+    def _castling_moves(self, out: List[int]):
+        rights = self.castling & ((WK | WQ) if self.white else (BK | BQ))
+        if not rights:
+            return
+        sq = self.sq
+        king = E1 if self.white else E8
+        them = not self.white
+        if self.kings[not self.white] != king or self.attacked(king, them):
+            return
+        # король не проходит через битое поле; конечное поле проверит make
+        if rights & (WK | BK) and sq[king + 1] == EMPTY and sq[king + 2] == EMPTY \
+                and not self.attacked(king + 1, them):
+            out.append(king | (king + 2) << 7 | CASTLE_FLAG << 17)
+        if rights & (WQ | BQ) and sq[king - 1] == EMPTY and sq[king - 2] == EMPTY and sq[king - 3] == EMPTY \
+                and not self.attacked(king - 1, them):
+            out.append(king | (king - 2) << 7 | CASTLE_FLAG << 17)
+
+    def pseudo_moves(self) -> List[int]:
+        return self.tactical_moves() + self.quiet_moves()
+
+    def is_pseudo_legal(self, m: int) -> bool:
+        """Возможен ли ход m (например, из таблицы транспозиций) в этой позиции без учёта шаха."""
+        frm, to, promo, flag = m & 127, m >> 7 & 127, m >> 14 & 7, m >> 17
+        sq = self.sq
+        white = self.white
+        p, t = sq[frm], sq[to]
+        if p == EMPTY or p == OFF or (p > 0) != white:
+            return False
+        if t == OFF or t != EMPTY and (t > 0) == white:
+            return False
+        pt = p if white else -p
+        if flag & CASTLE_FLAG:
+            out: List[int] = []
+            if pt == chess.KING:
+                self._castling_moves(out)
+            return m in out
+        if pt == chess.PAWN:
+            fwd = 10 if white else -10
+            rank = SQ64[frm] >> 3
+            if bool(promo) != (rank == (6 if white else 1)):
+                return False
+            if flag & EP_FLAG:
+                return to == self.ep != 0 and to - frm in (fwd - 1, fwd + 1)
+            if flag & DOUBLE_FLAG:
+                return (to == frm + 2 * fwd and rank == (1 if white else 6)
+                        and sq[frm + fwd] == EMPTY and t == EMPTY)
+            if to == frm + fwd:
+                return t == EMPTY
+            return to - frm in (fwd - 1, fwd + 1) and t != EMPTY
+        if promo or flag:
+            return False
+        if pt == chess.KNIGHT:
+            return to - frm in KNIGHT_STEPS
+        if pt == chess.KING:
+            return to - frm in KING_STEPS
+        d = RAY[to - frm + 119]
+        if d not in SLIDES[pt]:
+            return False
+        s = frm + d
+        while s != to:
+            if sq[s] != EMPTY:
+                return False
+            s += d
+        return True
+
+    def has_legal_move(self, in_check: bool = True) -> bool:
+        """Есть ли хоть один легальный ход. Ходы перебираются по одной фигуре, король — последним
+        (его ходы проверять дороже всего); рокировку смотреть не нужно: если она легальна,
+        то легален и шаг короля в сторону ладьи."""
+        sq = self.sq
+        white = self.white
+        enemy = BLACK_PIECES if white else WHITE_PIECES
+        king = self.kings[not white]
+        make, unmake = self.make, self.unmake
+        for frm in list(self.pieces[not white]) + [king]:
+            pt = sq[frm]
+            if pt < 0:
+                pt = -pt
+            if pt == 6 and frm != king:
+                continue
+            moves = []
+            if pt == 1:
+                fwd = 10 if white else -10
+                flag = frm | (PROMOTIONS[0] << 14 if SQ64[frm] >> 3 == (6 if white else 1) else 0)
+                if sq[frm + fwd] == EMPTY:
+                    moves.append(flag | (frm + fwd) << 7)
+                    # двойной ход может закрыть от шаха там, где одинарный не закрывает
+                    if SQ64[frm] >> 3 == (1 if white else 6) and sq[frm + 2 * fwd] == EMPTY:
+                        moves.append(frm | (frm + 2 * fwd) << 7 | DOUBLE_FLAG << 17)
+                for to in (frm + fwd - 1, frm + fwd + 1):
+                    if sq[to] in enemy:
+                        moves.append(flag | to << 7)
+                    elif to == self.ep:
+                        moves.append(frm | to << 7 | EP_FLAG << 17)
+            elif pt == 2 or pt == 6:
+                for d in STEPS[pt]:
+                    t = sq[frm + d]
+                    if t == EMPTY or t in enemy:
+                        moves.append(frm | (frm + d) << 7)
+            else:
+                for d in STEPS[pt]:
+                    to = frm + d
+                    while sq[to] == EMPTY:
+                        moves.append(frm | to << 7)
+                        to += d
+                    if sq[to] in enemy:
+                        moves.append(frm | to << 7)
+            for m in moves:
+                if make(m, in_check):
+                    unmake()
+                    return True
+        return False
+
+    # --- сведения о позиции ---
+
+    def piece_type(self, s: int) -> int:
+        p = self.sq[s]
+        return p if p > 0 else -p
+
+    def is_capture(self, m: int) -> bool:
+        return self.sq[m >> 7 & 127] != EMPTY or bool(m >> 17 & EP_FLAG)
+
+    def has_pieces(self) -> bool:
+        """Есть ли у стороны, которая ходит, что-то кроме короля и пешек."""
+        sq = self.sq
+        return any(sq[s] not in (1, -1, 6, -6) for s in self.pieces[not self.white])
+
+    def is_insufficient_material(self) -> bool:
+        """Как chess.Board.is_insufficient_material."""
+        sq = self.sq
+        # обычно на доске есть пешка, ладья или ферзь — тогда ответ сразу
+        for s in self.pieces[0]:
+            if sq[s] in (1, 4, 5):
+                return False
+        for s in self.pieces[1]:
+            if sq[s] in (-1, -4, -5):
+                return False
+        return self._insufficient(0) and self._insufficient(1)
+
+    def _insufficient(self, side: int) -> bool:
+        sq = self.sq
+        types = [abs(sq[s]) for s in self.pieces[side]]
+        if any(t in (chess.PAWN, chess.ROOK, chess.QUEEN) for t in types):
+            return False
+        if chess.KNIGHT in types:
+            others = [abs(sq[s]) for s in self.pieces[1 - side]]
+            return len(types) <= 2 and all(t in (chess.KING, chess.QUEEN) for t in others)
+        if chess.BISHOP in types:
+            everyone = self.pieces[0] | self.pieces[1]
+            bishops = [s for s in everyone if abs(sq[s]) == chess.BISHOP]
+            colours = {_square_colour(s) for s in bishops}
+            return len(colours) == 1 and not any(abs(sq[s]) in (chess.PAWN, chess.KNIGHT) for s in everyone)
+        return True
+
+    def piece_count(self) -> int:
+        return len(self.pieces[0]) + len(self.pieces[1])
+
+    # --- связь с python-chess ---
+
+    def to_move(self, m: int) -> chess.Move:
+        promo = m >> 14 & 7
+        return chess.Move(SQ64[m & 127], SQ64[m >> 7 & 127], promo or None)
+
+    def from_move(self, move: chess.Move) -> int:
+        """Легальный ход python-chess -> ход этой доски."""
+        frm, to = SQ120[move.from_square], SQ120[move.to_square]
+        pt, flag = self.piece_type(frm), 0
+        if pt == chess.PAWN and to == self.ep and (to - frm) % 10:
+            flag = EP_FLAG
+        elif pt == chess.PAWN and abs(to - frm) == 20:
+            flag = DOUBLE_FLAG
+        elif pt == chess.KING and abs(to - frm) == 2:
+            flag = CASTLE_FLAG
+        return frm | to << 7 | (move.promotion or 0) << 14 | flag << 17
+
+    def to_board(self) -> chess.Board:
+        """Текущая позиция как chess.Board (без истории ходов) — для таблиц эндшпиля."""
+        board = chess.Board(None)
+        for s in self.pieces[0] | self.pieces[1]:
+            p = self.sq[s]
+            board.set_piece_at(SQ64[s], chess.Piece(abs(p), p > 0))
+        board.turn = self.white
+        fen_rights = "".join(ch for bit, ch in ((WK, "K"), (WQ, "Q"), (BK, "k"), (BQ, "q")) if self.castling & bit)
+        board.set_castling_fen(fen_rights or "-")
+        board.ep_square = SQ64[self.ep] if self.ep else None
+        board.halfmove_clock = self.halfmove
+        return board
+
+
+def perft(board: SearchBoard, depth: int) -> int:
+    """Число листьев дерева легальных ходов глубины depth."""
+    if depth == 0:
+        return 1
+    nodes = 0
+    in_check = board.in_check()
+    for m in board.pseudo_moves():
+        if board.make(m, in_check):
+            nodes += perft(board, depth - 1) if depth > 1 else 1
+            board.unmake()
+    return nodes
@@ -0,0 +1,232 @@
+import queue
+import threading
+import time
+import chess
+from typing import List, Optional, Tuple
+from ai import ChessAI
+from move_helper import MoveHelper
+
+
+class SearchService:
+    """Поиск хода в фоновом потоке, чтобы цикл pygame не замирал.
+
+    start() отдаёт воркеру копию доски, poll() раз в кадр забирает результат.
+    Каждый запрос получает номер; результаты устаревших (отменённых) запросов
+    молча отбрасываются.
+
+    С ponder=True после своего хода движок сразу ищет ответ на ожидаемый ход
+    соперника (второй ход главного варианта), пока человек думает. Если человек
+    сыграл его, start() забирает уже идущий или готовый поиск (ход угадан);
+    иначе фоновый поиск останавливается. Бюджет тот же, что у обычного хода,
+    поэтому сила игры не меняется — только ожидание.
+    """
+
+    def __init__(self, ai: ChessAI, ponder: bool = False):
+        self.ai = ai
+        self.ponder = ponder
+        # (номер, доска, movetime, готовый ход — если поиск уже сделан на время соперника)
+        self._requests: "queue.Queue[Optional[Tuple[int, chess.Board, Optional[float], Optional[chess.Move]]]]" = \
+            queue.Queue()
+        self._results: "queue.Queue[Tuple[int, Optional[chess.Move]]]" = queue.Queue()
+        self._current = 0
+        self._busy = False
+        self._started = 0.0
+        self.last_time = 0.0         # сколько ждали последний ход, с
+        self.last_ponder_hit = False  # последний ход взят из поиска на время соперника
+        self.ponder_hits = 0
+        # поиск на время соперника: позиция после ожидаемого хода (None — не идёт),
+        # готовый результат и номер запроса, который этот поиск забрал
+        self._lock = threading.Lock()
+        self._ponder_fen: Optional[str] = None
+        self._ponder_done = False
+        self._ponder_move: Optional[chess.Move] = None
+        self._ponder_for: Optional[int] = None
+        self._stale = lambda: False
+        # как в UCI: stop мог прийти до того, как поиск сбросил флаг остановки
+        ai.on_iteration = self._on_iteration
+        self._thread = threading.Thread(target=self._run, name="chess-search", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    @property
+    def pondering(self) -> bool:
+        return self._ponder_fen is not None and not self._ponder_done
+
+    def start(self, board: chess.Board, movetime: Optional[float] = None) -> int:
+        with self._lock:
+            if self._ponder_fen is not None and self._ponder_fen == board.fen():
+                return self._ponder_hit(board, movetime)
+        self.cancel()
+        self._current += 1
+        self._busy = True
+        self._started = time.perf_counter()
+        self.last_ponder_hit = False
+        self._requests.put((self._current, board.copy(), movetime, None))
+        return self._current
+
+    def _ponder_hit(self, board: chess.Board, movetime: Optional[float]) -> int:
+        # вызывается под self._lock
+        self._current += 1
+        self._busy = True
+        self._started = time.perf_counter()
+        self.last_ponder_hit = True
+        self.ponder_hits += 1
+        if self._ponder_done:
+            # ответ готов; через воркер — чтобы он сразу начал думать над следующим ходом
+            self._requests.put((self._current, board.copy(), movetime, self._ponder_move))
+            self._ponder_fen = None
+        else:
+            self._ponder_for = self._current  # поиск ещё идёт — его результат и будет ответом
+        return self._current
+
+    def cancel(self):
+        with self._lock:
+            running = self._busy or self.pondering
+            self._ponder_fen = None
+            self._ponder_for = None
+            if self._busy:
+                self._current += 1
+                self._busy = False
+        if running:
+            self.ai.stop()
+
+    def poll(self) -> Optional[chess.Move]:
+        """Ход по текущему запросу, если поиск завершился; иначе None."""
+        while True:
+            try:
+                req_id, mv = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if req_id == self._current and self._busy:
+                self._busy = False
+                self.last_time = time.perf_counter() - self._started
+                return mv
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+        self._thread.join(timeout=1.0)
+
+    def _on_iteration(self, depth: int, scored: List[Tuple[chess.Move, int]]):
+        if self._stale():
+            self.ai.stop()
+
+    def _run(self):
+        while True:
+            req = self._requests.get()
+            if req is None:
+                return
+            req_id, board, movetime, mv = req
+            if req_id != self._current:
+                continue  # отменён ещё до начала поиска
+            if mv is None:
+                self._stale = lambda: req_id != self._current
+                mv = self.ai.choose_move(board, movetime)
+            # пока ход соперника угадывается, после каждого ответа думаем дальше
+            while req_id is not None:
+                board = self._deliver(req_id, board, mv)
+                if board is None:
+                    break
+                req_id, mv = self._ponder(board, movetime)
+
+    def _deliver(self, req_id: int, board: chess.Board, mv: Optional[chess.Move]) -> Optional[chess.Board]:
+        """Отдаёт ход в GUI; возвращает позицию, над которой думать на время соперника."""
+        ponder_board = self._ponder_board(board, mv) if self.ponder else None
+        with self._lock:
+            if req_id != self._current:
+                ponder_board = None  # запрос отменили, пока считали
+            if ponder_board is not None:
+                # позиция для угадывания известна раньше, чем ход дойдёт до доски в GUI
+                self._ponder_fen, self._ponder_done, self._ponder_for = ponder_board.fen(), False, None
+            self._results.put((req_id, mv))
+        return ponder_board
+
+    def _ponder_board(self, board: chess.Board, mv: Optional[chess.Move]) -> Optional[chess.Board]:
+        if mv is None:
+            return None
+        reply = self.ai.expected_reply(board, mv)
+        if reply is None:
+            return None
+        board = board.copy()
+        board.push(mv)
+        board.push(reply)
+        return None if board.is_game_over() else board
+
+    def _ponder(self, board: chess.Board, movetime: Optional[float]) -> Tuple[Optional[int], Optional[chess.Move]]:
+        """Поиск на время соперника. Если ход угадан и ответ уже ждут — (номер запроса, ход)."""
+        fen = board.fen()
+        self._stale = lambda: self._ponder_fen != fen
+        if self._stale():
+            return None, None
+        mv = self.ai.choose_move(board, movetime)
+        with self._lock:
+            if self._ponder_fen != fen:
+                return None, None  # человек сыграл другое — результат не нужен
+            if self._ponder_for is not None:
+                req_id, self._ponder_fen, self._ponder_for = self._ponder_for, None, None
+                return req_id, mv
+            self._ponder_move, self._ponder_done = mv, True  # ждём хода человека
+        return None, None
+
+
+class HintService:
+    """Подсказки в фоновом потоке: кадр не ждёт поиска по позиции.
+
+    request() раз в кадр: возвращает готовые подсказки для позиции, а если их
+    ещё нет — ставит поиск (прежний, по другой позиции, останавливается) и
+    возвращает None.
+    """
+
+    def __init__(self, helper: MoveHelper, k: int = 5):
+        self.helper = helper
+        self.k = k
+        self._requests: "queue.Queue[Optional[chess.Board]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._fen: Optional[str] = None  # позиция текущего запроса
+        self._result: Optional[List[Tuple[chess.Move, int]]] = None
+        self._thread = threading.Thread(target=self._run, name="chess-hints", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        return self._fen is not None and self._result is None
+
+    def request(self, board: chess.Board) -> Optional[List[Tuple[chess.Move, int]]]:
+        fen = board.fen()
+        with self._lock:
+            if fen == self._fen:
+                return self._result
+            running = self.busy
+            self._fen, self._result = fen, None
+        if running:
+            self.helper.ai.stop()
+        self._requests.put(board.copy())
+        return None
+
+    def cancel(self):
+        with self._lock:
+            running = self.busy
+            self._fen = self._result = None
+        if running:
+            self.helper.ai.stop()
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            board = self._requests.get()
+            if board is None:
+                return
+            fen = board.fen()
+            if fen != self._fen:
+                continue  # позиция уже сменилась
+            result = self.helper.suggestions(board, self.k)
+            with self._lock:
+                if fen == self._fen:
+                    self._result = result
@@ -0,0 +1,80 @@
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+# порядок счётчиков, которые ChessAI снимает в начале и в конце поиска
+COUNTERS = ("nodes", "qnodes", "leaf_evals", "beta_cutoffs", "first_move_cutoffs",
+            "tt_probes", "tt_hits", "book_hits", "book_misses", "tb_hits", "tb_misses",
+            "store_hits", "store_misses")
+
+
+@dataclass
+class SearchStats:
+    """Статистика одного вызова choose_move / top_moves."""
+    kind: str = ""
+    depth: int = 0
+    elapsed: float = 0.0
+    nodes: int = 0
+    qnodes: int = 0
+    leaf_evals: int = 0
+    beta_cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0
+    book_hits: int = 0
+    book_misses: int = 0
+    tb_hits: int = 0
+    tb_misses: int = 0
+    store_hits: int = 0
+    store_misses: int = 0
+    depth_times: Dict[int, float] = field(default_factory=dict)
+    depth_nodes: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def total_nodes(self) -> int:
+        return self.nodes + self.qnodes
+
+    @property
+    def nps(self) -> float:
+        return self.total_nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Доля отсечений на первом же ходе — мера качества сортировки ходов."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """Эффективный коэффициент ветвления: по двум последним итерациям или корень степени depth."""
+        depths = sorted(self.depth_nodes)
+        if len(depths) >= 2 and self.depth_nodes[depths[-2]]:
+            return self.depth_nodes[depths[-1]] / self.depth_nodes[depths[-2]]
+        if self.depth and self.nodes:
+            return self.nodes ** (1.0 / self.depth)
+        return 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def as_dict(self) -> Dict:
+        d = asdict(self)
+        d.update(total_nodes=self.total_nodes, nps=round(self.nps), branching_factor=round(self.branching_factor, 2),
+                 first_move_cutoff_rate=round(self.first_move_cutoff_rate, 3), tt_hit_rate=round(self.tt_hit_rate, 3))
+        return d
+
+    def summary_lines(self) -> List[str]:
+        lines = [
+            f"{self.kind}  глубина {self.depth}  {self.elapsed * 1000:.0f} мс",
+            f"узлы {self.nodes} + q {self.qnodes}  ({self.nps / 1000:.1f}k/с)",
+            f"листья {self.leaf_evals}  ветвление {self.branching_factor:.1f}",
+            f"отсечения {self.beta_cutoffs}  с 1-го хода {self.first_move_cutoff_rate:.0%}",
+            f"TT {self.tt_hits}/{self.tt_probes} ({self.tt_hit_rate:.0%})",
+        ]
+        if self.book_hits or self.book_misses or self.tb_hits or self.tb_misses:
+            lines.append(f"книга {self.book_hits}/{self.book_hits + self.book_misses}  "
+                         f"таблицы {self.tb_hits}/{self.tb_hits + self.tb_misses}")
+        if self.store_hits or self.store_misses:
+            lines.append(f"хранилище {self.store_hits}/{self.store_hits + self.store_misses}")
+        if self.depth_times:
+            lines.append("  ".join(f"d{d}:{t * 1000:.0f}мс" for d, t in sorted(self.depth_times.items())))
+        return lines
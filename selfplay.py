@@ -0,0 +1,222 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import chess
+import chess.pgn
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from ai import ChessAI
+
+# стартовые позиции: сбалансированные дебюты, каждая играется дважды со сменой цвета
+OPENINGS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pppp1ppp/4p3/8/3PP3/8/PPP2PPP/RNBQKBNR b KQkq - 0 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/2PP4/8/PP2PPPP/RNBQKBNR b KQkq - 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/2PP4/8/PP2PPPP/RNBQKBNR b KQkq - 0 2",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkbnr/pp2pppp/2p5/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq - 0 3",
+    "rnbqkb1r/pppppp1p/5np1/8/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3",
+    "rnbqkbnr/ppp2ppp/4p3/3p4/3PP3/8/PPP2PPP/RNBQKBNR w KQkq - 0 3",
+]
+MAX_PLIES = 300  # дальше — присуждаем ничью
+
+# ключи конфигурации движка: короткое имя -> аргумент ChessAI
+_ALIASES = {"depth": "max_depth", "tt": "tt_size_mb", "book": "book_path", "syzygy": "syzygy_dir"}
+
+
+def parse_config(spec: str) -> Dict:
+    """'depth=3,margin=30,quiescence=0,movetime=0.5' -> kwargs ChessAI (+ movetime)."""
+    cfg: Dict = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, _, raw = part.partition("=")
+        key = _ALIASES.get(key.strip(), key.strip())
+        raw = raw.strip()
+        if raw.lower() in ("none", ""):
+            value = None
+        elif raw.lower() in ("true", "on", "yes"):
+            value = True
+        elif raw.lower() in ("false", "off", "no"):
+            value = False
+        else:
+            try:
+                value = int(raw)
+            except ValueError:
+                try:
+                    value = float(raw)
+                except ValueError:
+                    value = raw
+        cfg[key] = value
+    return cfg
+
+
+def _make_engine(cfg: Dict) -> Tuple[ChessAI, Optional[float]]:
+    cfg = dict(cfg)
+    movetime = cfg.pop("movetime", None)
+    cfg.setdefault("book_path", None)  # без книги партии из одной позиции были бы одинаковыми
+    return ChessAI(**cfg), movetime
+
+
+def play_game(index: int, fen: str, white_cfg: Dict, black_cfg: Dict, a_is_white: bool,
+              max_plies: int = MAX_PLIES) -> Dict:
+    """Одна партия в процессе-воркере. Возвращает PGN и результат с точки зрения движка A."""
+    random.seed(index)
+    engines = {chess.WHITE: _make_engine(white_cfg), chess.BLACK: _make_engine(black_cfg)}
+    board = chess.Board(fen)
+    spent = {chess.WHITE: 0.0, chess.BLACK: 0.0}
+    moves = {chess.WHITE: 0, chess.BLACK: 0}
+    termination = "normal"
+    # ничью по повторению/50 ходам фиксируем, только когда она наступила, а не когда её «можно потребовать ходом»
+    while not (board.is_game_over() or board.is_repetition(3) or board.can_claim_fifty_moves()):
+        if len(board.move_stack) >= max_plies:
+            termination = "adjudication"
+            break
+        ai, movetime = engines[board.turn]
+        start = time.perf_counter()
+        mv = ai.choose_move(board, movetime)
+        spent[board.turn] += time.perf_counter() - start
+        moves[board.turn] += 1
+        if mv is None:
+            break
+        board.push(mv)
+    result = board.result()
+    if result == "*":
+        result = "1/2-1/2"
+    white_points = {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5)
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "ChessAI self-play"
+    game.headers["Round"] = str(index + 1)
+    game.headers["White"] = ("A " if a_is_white else "B ") + _describe(white_cfg)
+    game.headers["Black"] = ("B " if a_is_white else "A ") + _describe(black_cfg)
+    game.headers["Result"] = result
+    game.headers["Termination"] = termination
+    a_color = chess.WHITE if a_is_white else chess.BLACK
+    return {
+        "index": index,
+        "pgn": str(game),
+        "result": result,
+        "a_score": white_points if a_is_white else 1.0 - white_points,
+        "a_time": spent[a_color], "a_moves": moves[a_color],
+        "b_time": spent[not a_color], "b_moves": moves[not a_color],
+    }
+
+
+def _describe(cfg: Dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted(cfg.items())) or "default"
+
+
+MIN_ELO_GAMES = 10  # на меньшем числе партий интервал не считаем — он ничего не говорит
+
+
+def elo_estimate(scores: List[float]) -> Tuple[float, float, float]:
+    """Разница Эло A−B и 95% интервал по модели выигрыш/ничья/проигрыш.
+
+    К исходам добавляется по половине выигрыша и проигрыша: без этого при
+    одинаковых результатах (одни ничьи) дисперсия нулевая и интервал схлопывается.
+    Меньше MIN_ELO_GAMES партий — интервал неограничен (-inf .. +inf).
+    """
+    n = len(scores)
+    if n == 0:
+        return 0.0, -math.inf, math.inf
+
+    def elo(p: float) -> float:
+        if p <= 0:
+            return -math.inf
+        if p >= 1:
+            return math.inf
+        return -400 * math.log10(1 / p - 1) + 0.0  # + 0.0: без «-0» при равном счёте
+
+    mean = sum(scores) / n
+    if n < MIN_ELO_GAMES:
+        return elo(mean), -math.inf, math.inf
+    wins = scores.count(1.0) + 0.5
+    losses = scores.count(0.0) + 0.5
+    draws = n - scores.count(1.0) - scores.count(0.0)
+    total = wins + draws + losses
+    p = (wins + 0.5 * draws) / total
+    var = (wins * (1 - p) ** 2 + draws * (0.5 - p) ** 2 + losses * p ** 2) / total
+    margin = 1.96 * math.sqrt(var / n)
+    return elo(mean), elo(mean - margin), elo(mean + margin)
+
+
+def format_elo(value: float) -> str:
+    return f"{value:+.0f}" if math.isfinite(value) else ("+inf" if value > 0 else "-inf")
+
+
+def run(a_cfg: Dict, b_cfg: Dict, games: int, openings: List[str], workers: int,
+        pgn_path: Optional[str], max_plies: int = MAX_PLIES) -> Dict:
+    jobs = []
+    for i in range(games):
+        fen = openings[(i // 2) % len(openings)]
+        a_white = i % 2 == 0
+        jobs.append((i, fen, a_cfg if a_white else b_cfg, b_cfg if a_white else a_cfg, a_white, max_plies))
+
+    scores: List[float] = []
+    totals = {"a_time": 0.0, "a_moves": 0, "b_time": 0.0, "b_moves": 0}
+    wins = draws = losses = 0
+    out = open(pgn_path, "w", encoding="utf-8") if pgn_path else None
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(play_game, *job) for job in jobs]
+            for fut in as_completed(futures):
+                g = fut.result()
+                # партии пишем сразу по готовности, чтобы прерванный прогон не терял результаты
+                if out:
+                    out.write(g["pgn"] + "\n\n")
+                    out.flush()
+                scores.append(g["a_score"])
+                for key in totals:
+                    totals[key] += g[key]
+                wins += g["a_score"] == 1.0
+                draws += g["a_score"] == 0.5
+                losses += g["a_score"] == 0.0
+                elo, lo, hi = elo_estimate(scores)
+                print(f"[selfplay] {len(scores)}/{games}  +{wins} ={draws} -{losses}  "
+                      f"Elo {format_elo(elo)} [{format_elo(lo)}, {format_elo(hi)}]", file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+
+    elo, lo, hi = elo_estimate(scores)
+    return {
+        "games": len(scores), "wins": wins, "draws": draws, "losses": losses,
+        "score": sum(scores) / len(scores) if scores else 0.0,
+        "elo": elo, "elo_low": lo, "elo_high": hi,
+        "a_avg_move_time": totals["a_time"] / totals["a_moves"] if totals["a_moves"] else 0.0,
+        "b_avg_move_time": totals["b_time"] / totals["b_moves"] if totals["b_moves"] else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Engine-vs-engine self-play tournament for ChessAI")
+    ap.add_argument("-a", default="depth=3", help="engine A config, e.g. 'depth=3,margin=30,quiescence=0'")
+    ap.add_argument("-b", default="depth=2", help="engine B config")
+    ap.add_argument("-n", "--games", type=int, default=20)
+    ap.add_argument("--openings", help="file with one FEN per line (default: built-in list)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--pgn", default="selfplay.pgn", help="output PGN file ('' to disable)")
+    ap.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    args = ap.parse_args(argv)
+
+    openings = OPENINGS
+    if args.openings:
+        with open(args.openings, encoding="utf-8") as f:
+            openings = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    report = run(parse_config(args.a), parse_config(args.b), args.games, openings, args.workers,
+                 args.pgn or None, args.max_plies)
+    print(f"A: {args.a}\nB: {args.b}")
+    print(f"games {report['games']}: +{report['wins']} ={report['draws']} -{report['losses']}  "
+          f"score {report['score']:.3f}")
+    print(f"Elo A-B: {format_elo(report['elo'])}  "
+          f"(95%: {format_elo(report['elo_low'])} .. {format_elo(report['elo_high'])})")
+    print(f"avg time/move: A {report['a_avg_move_time'] * 1000:.0f} ms, B {report['b_avg_move_time'] * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
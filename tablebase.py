@@ -0,0 +1,77 @@
+import os
+import chess
+import chess.syzygy
+from typing import Optional
+
+SYZYGY_DIR = "assets/syzygy"  # таблицы Syzygy (*.rtbw / *.rtbz)
+
+# оценка выигрыша по таблицам: больше любого материала, но меньше мата
+TB_WIN = 20000
+
+
+class Tablebase:
+    """Эндшпильные таблицы Syzygy. Без файлов available == False и зондирование не выполняется."""
+
+    def __init__(self, directory: Optional[str] = SYZYGY_DIR):
+        self.directory = directory
+        self.max_pieces = 0
+        self.hits = 0
+        self.misses = 0
+        self._tb: Optional[chess.syzygy.Tablebase] = None
+        if directory and os.path.isdir(directory):
+            tb = chess.syzygy.Tablebase()
+            if tb.add_directory(directory):
+                self._tb = tb
+                # имя таблицы вида "KRvK": все фигуры плюс разделитель "v"
+                self.max_pieces = max(len(name) - 1 for name in tb.wdl)
+            else:
+                tb.close()
+
+    @property
+    def available(self) -> bool:
+        return self._tb is not None
+
+    def applicable(self, board: chess.Board) -> bool:
+        return (self._tb is not None and not board.castling_rights
+                and chess.popcount(board.occupied) <= self.max_pieces)
+
+    def wdl(self, board: chess.Board) -> Optional[int]:
+        """WDL с точки зрения стороны, которая ходит (-2..2), или None, если таблицы нет."""
+        try:
+            wdl = self._tb.probe_wdl(board)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return wdl
+
+    def score(self, board: chess.Board) -> Optional[int]:
+        """Оценка для поиска: выигрыш/проигрыш или ничья (cursed win/blessed loss — ничья по правилу 50 ходов)."""
+        wdl = self.wdl(board)
+        if wdl is None:
+            return None
+        return TB_WIN if wdl > 1 else -TB_WIN if wdl < -1 else 0
+
+    def root_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Лучший ход по WDL и DTZ: выигрыш — кратчайший, проигрыш — самый упорный."""
+        best, best_key = None, None
+        for mv in board.legal_moves:
+            board.push(mv)
+            try:
+                # после хода таблицы отвечают за соперника — меняем знак WDL
+                key = (-self._tb.probe_wdl(board), self._tb.probe_dtz(board))
+            except KeyError:
+                board.pop()
+                self.misses += 1
+                return None
+            board.pop()
+            if best_key is None or key > best_key:
+                best, best_key = mv, key
+        if best is not None:
+            self.hits += 1
+        return best
+
+    def close(self):
+        if self._tb is not None:
+            self._tb.close()
+            self._tb = None
@@ -1,6 +1,7 @@
 import chess
-from typing import List, Tuple
+from typing import List, Tuple, Union
 from ai import ChessAI
+from analysis_cache import AnalysisCache
 
 PIECE_RU = {
     chess.PAWN: "пешкой",
@@ -16,8 +17,10 @@ def score_to_str(score: int) -> str:
         return "#"
     return f"{score:+d}"
 
-def top_tips(board: chess.Board, ai: ChessAI, k: int = 5) -> List[str]:
-    items: List[Tuple[chess.Move, int]] = ai.top_moves(board, k)
+def top_tips(board: chess.Board, ai: Union[ChessAI, AnalysisCache], k: int = 5) -> List[str]:
+    return format_tips(board, ai.top_moves(board, k))
+
+def format_tips(board: chess.Board, items: List[Tuple[chess.Move, int]]) -> List[str]:
     tips: List[str] = []
     for i, (mv, sc) in enumerate(items, 1):
         piece = board.piece_at(mv.from_square)
@@ -0,0 +1,78 @@
+import chess
+import chess.polyglot
+from typing import List, Optional, Tuple
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# примерный размер одной записи в памяти Python (кортеж + int-ключ + ссылки)
+_ENTRY_BYTES = 160
+
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_TURN_KEY = _RANDOM[780]
+
+# (key, depth, flag, score, move, generation); ход — в кодировке search_board.SearchBoard
+Entry = Tuple[int, int, int, float, Optional[int], int]
+
+
+def zobrist_key(board: chess.Board) -> int:
+    return chess.polyglot.zobrist_hash(board)
+
+
+def history_keys(board: chess.Board) -> List[int]:
+    """Ключи позиций партии с последнего необратимого хода (старые — первыми), без текущей."""
+    b = board.copy()
+    keys = []
+    for _ in range(min(board.halfmove_clock, len(b.move_stack))):
+        b.pop()
+        keys.append(zobrist_key(b))
+    keys.reverse()
+    return keys
+
+
+class TranspositionTable:
+    """Таблица транспозиций фиксированного размера.
+
+    Каждая корзина состоит из двух слотов: первый хранит самую глубокую запись
+    (заменяется только более глубокой или устаревшей), второй — всегда последнюю.
+    Поколение растёт с каждым новым поиском, так что записи прошлых ходов
+    остаются полезными, но постепенно вытесняются.
+    """
+
+    def __init__(self, size_mb: float = 16):
+        self.buckets = max(1, int(size_mb * 1024 * 1024) // (_ENTRY_BYTES * 2))
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        self._slots: List[Optional[Entry]] = [None] * (self.buckets * 2)
+        self.hits = 0
+        self.probes = 0
+        self.stores = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return sum(1 for e in self._slots if e is not None)
+
+    def probe(self, key: int) -> Optional[Entry]:
+        self.probes += 1
+        i = (key % self.buckets) * 2
+        for e in (self._slots[i], self._slots[i + 1]):
+            if e is not None and e[0] == key:
+                self.hits += 1
+                return e
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: float, move: Optional[int]):
+        i = (key % self.buckets) * 2
+        old = self._slots[i]
+        entry = (key, depth, flag, score, move, self.generation)
+        self.stores += 1
+        if old is None or old[1] <= depth or old[5] != self.generation:
+            if old is not None and old[0] != key and old[5] == self.generation:
+                # вытесненная глубокая запись ещё пригодится — во второй слот
+                self._slots[i + 1] = old
+            self._slots[i] = entry
+        else:
+            self._slots[i + 1] = entry
@@ -0,0 +1,191 @@
+import sys
+import threading
+import chess
+from typing import List, Optional, Tuple
+from ai import ChessAI, MATE_SCORE, MAX_DEPTH
+from transposition import TranspositionTable
+
+ENGINE_NAME = "ChessAI"
+ENGINE_AUTHOR = "Tako71"
+MOVE_OVERHEAD = 0.05   # секунды на связь с GUI, которые не тратим на поиск
+DEFAULT_MOVES_TO_GO = 30
+
+
+def allocate_time(time_left: float, inc: float = 0.0, movestogo: Optional[int] = None,
+                  overhead: float = MOVE_OVERHEAD) -> float:
+    """Бюджет на ход из остатка на часах: доля остатка плюс большая часть добавки, но не больше половины остатка."""
+    budget = time_left / (movestogo or DEFAULT_MOVES_TO_GO) + inc * 0.8
+    return max(0.01, min(budget, time_left / 2) - overhead)
+
+
+def format_score(score: int, pv_len: int) -> str:
+    if abs(score) >= MATE_SCORE:
+        # расстояние до мата поиск не хранит — оцениваем по длине главного варианта
+        moves = max(1, (pv_len + 1) // 2)
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+class UCIEngine:
+    """UCI-обёртка над ChessAI: команды читаются в основном потоке, поиск идёт в отдельном,
+    поэтому stop и isready обрабатываются сразу, даже посреди поиска."""
+
+    def __init__(self, ai: Optional[ChessAI] = None, out=sys.stdout):
+        self.ai = ai or ChessAI()
+        self.ai.on_iteration = self._on_iteration
+        self.out = out
+        self.board = chess.Board()
+        self._out_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._search_board: Optional[chess.Board] = None
+        self._stop_requested = False
+        self._infinite = False
+        self._best: Optional[chess.Move] = None  # первый ход последней выданной строки info
+        self._release = threading.Event()  # при go infinite bestmove выдаём только после stop
+
+    def send(self, line: str):
+        with self._out_lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def loop(self, stream=sys.stdin):
+        for line in stream:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def handle(self, line: str) -> bool:
+        """Одна команда GUI. False — пора выходить (quit)."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        cmd, args = tokens[0], tokens[1:]
+        if cmd == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Hash type spin default 16 min 1 max 1024")
+            self.send("uciok")
+        elif cmd == "isready":
+            self.send("readyok")
+        elif cmd == "setoption":
+            self._setoption(args)
+        elif cmd == "ucinewgame":
+            self.stop()
+            self.ai.new_game()
+            self.board = chess.Board()
+        elif cmd == "position":
+            self.stop()
+            self._position(args)
+        elif cmd == "go":
+            self.stop()
+            self._go(args)
+        elif cmd == "stop":
+            self.stop()
+        elif cmd == "quit":
+            return False
+        return True
+
+    def stop(self):
+        """Прерывает поиск и ждёт, пока воркер выдаст bestmove."""
+        if self._thread is None:
+            return
+        self._stop_requested = True
+        self.ai.stop()
+        self._release.set()
+        self._thread.join()
+        self._thread = None
+
+    def _setoption(self, args: List[str]):
+        # setoption name <id> [value <x>]
+        text = " ".join(args)
+        name, _, value = text.partition(" value ")
+        name = name.replace("name", "", 1).strip().lower()
+        if name == "hash" and value.strip().isdigit():
+            self.ai.tt = TranspositionTable(int(value))
+
+    def _position(self, args: List[str]):
+        if not args:
+            return
+        if args[0] == "startpos":
+            board, rest = chess.Board(), args[1:]
+        elif args[0] == "fen":
+            fen_end = args.index("moves") if "moves" in args else len(args)
+            board, rest = chess.Board(" ".join(args[1:fen_end])), args[fen_end:]
+        else:
+            return
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        self.board = board
+
+    def _go(self, args: List[str]):
+        params = {}
+        i = 0
+        while i < len(args):
+            key = args[i]
+            if key in ("infinite", "ponder"):
+                params[key] = True
+                i += 1
+            elif key == "searchmoves":
+                break  # не поддерживается — ищем по всем ходам
+            else:
+                if i + 1 < len(args):
+                    params[key] = args[i + 1]
+                i += 2
+        depth = int(params["depth"]) if "depth" in params else None
+        movetime: Optional[float] = None
+        if "movetime" in params:
+            movetime = max(0.01, int(params["movetime"]) / 1000 - MOVE_OVERHEAD)
+        else:
+            clock = params.get("wtime" if self.board.turn == chess.WHITE else "btime")
+            if clock is not None:
+                inc = params.get("winc" if self.board.turn == chess.WHITE else "binc", 0)
+                mtg = int(params["movestogo"]) if "movestogo" in params else None
+                movetime = allocate_time(int(clock) / 1000, int(inc) / 1000, mtg)
+        self._infinite = "infinite" in params or "ponder" in params
+        if self._infinite:
+            movetime, depth = None, depth or MAX_DEPTH
+        elif movetime is None and depth is None:
+            depth = self.ai.max_depth
+        self._stop_requested = False
+        self._best = None
+        self._release.clear()
+        self._search_board = self.board.copy()
+        self._thread = threading.Thread(target=self._search, args=(self._search_board, movetime, depth),
+                                        name="uci-search", daemon=True)
+        self._thread.start()
+
+    def _search(self, board: chess.Board, movetime: Optional[float], depth: Optional[int]):
+        mv = self.ai.choose_move(board, movetime, depth)
+        if self._best is not None:
+            # среди равных по оценке ходов choose_move выбирает случайно — держимся показанного pv
+            mv = self._best
+        if self._infinite:
+            # по протоколу при infinite нельзя отвечать, пока GUI не пришлёт stop
+            self._release.wait()
+        if mv is None:
+            mv = next(iter(board.legal_moves), None)
+        self.send(f"bestmove {mv.uci() if mv else '0000'}")
+
+    def _on_iteration(self, depth: int, scored: List[Tuple[chess.Move, int]]):
+        if self._stop_requested:
+            # stop мог прийти до того, как поиск сбросил флаг остановки
+            self.ai.stop()
+        board = self._search_board
+        if board is None or not scored:
+            return
+        mv, score = max(scored, key=lambda x: x[1])
+        pv = self.ai._principal_variation(board, mv, depth)
+        self._best = mv
+        stats = self.ai.stats_snapshot()
+        self.send(f"info depth {depth} score {format_score(score, len(pv))} nodes {stats.total_nodes} "
+                  f"nps {round(stats.nps)} time {round(stats.elapsed * 1000)} pv {' '.join(m.uci() for m in pv)}")
+
+
+def main() -> int:
+    UCIEngine().loop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
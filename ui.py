@@ -1,7 +1,11 @@
 # ui.py
+import json
+import os
+import time
 import pygame
 import chess
 from typing import Tuple, Optional, List, Dict
+from difficulty import LEVELS, Difficulty
 
 # ----- поле и панель -----
 BOARD_SIZE = 640
@@ -11,6 +15,10 @@ HEIGHT = BOARD_SIZE + MARGIN * 2
 PANEL_H = 170
 WIN_W, WIN_H = WIDTH, HEIGHT + PANEL_H
 SQ = BOARD_SIZE // 8
+# области экрана для частичного обновления (display.update)
+BOARD_AREA = pygame.Rect(0, 0, WIDTH, HEIGHT)
+PANEL_AREA = pygame.Rect(0, HEIGHT, WIN_W, PANEL_H)
+TEXT_CACHE_SIZE = 256
 
 LIGHT = (240, 217, 181)
 DARK  = (181, 136,  99)
@@ -21,6 +29,13 @@ SEL   = (106, 246, 105)
 TEXT  = (30, 30, 30)
 PANEL = (247, 247, 247)
 LABEL = (60, 60, 60)
+BG    = (25, 25, 25)  # фон меню и полей вокруг доски
+
+# ----- шрифты -----
+FONT_FAMILIES = ["Inter", "Montserrat", "Nunito", "DejaVu Sans"]
+# match_font может сканировать весь список системных шрифтов — найденный путь кэшируем на диске
+CACHE_DIR = os.environ.get("CHESSAI_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "chessai"))
+FONT_CACHE = os.path.join(CACHE_DIR, "fonts.json")
 
 # ----- рендер фигур -----
 SPRITE_MODE = True  # если False — векторный рендер (фолбэк)
@@ -33,29 +48,75 @@ B_FILL, B_OUT = (28, 28, 28), (230, 230, 230)
 
 class UI:
     def __init__(self):
-        pygame.init()
+        # только нужные подсистемы: pygame.init() поднимает ещё звук и джойстики
+        pygame.display.init()
+        pygame.font.init()
         pygame.display.set_caption("Шахматы — ИИ")
         self.screen = pygame.display.set_mode((WIN_W, WIN_H))
+        self.first_frame_at: Optional[float] = None  # perf_counter первого показанного кадра меню
+        self._font_path = self._resolve_font()
         self.small  = self._pick_font(18)
         self.medium = self._pick_font(24)
         self.large  = self._pick_font(44)
         self.button_rect = pygame.Rect(WIDTH - 210 - 20, HEIGHT + 18, 210, 42)
 
-        # кэш спрайтов (или None, если папки нет)
+        # кэш спрайтов (или None, если папки нет); PNG читаются при первой отрисовке доски, не до меню
         self._sprite_cache: Dict[str, pygame.Surface] = {}
-        self._try_load_sprites()
+        self._sprites_loaded = False
+        # готовые к blit поверхности: фигуры под размер клетки, статичное поле с координатами, надписи
+        self._piece_cache: Dict[Tuple[str, int], pygame.Surface] = {}
+        self._board_layer: Dict[bool, pygame.Surface] = {}
+        self._text_cache: Dict[Tuple[int, str, Tuple[int, ...]], pygame.Surface] = {}
 
     # -------------------- шрифты --------------------
+    def _resolve_font(self) -> Optional[str]:
+        """Путь к первому найденному шрифту из FONT_FAMILIES (None — встроенный шрифт pygame)."""
+        try:
+            with open(FONT_CACHE, encoding="utf-8") as f:
+                cached = json.load(f)
+            path = cached.get("path")
+            # «не найдено» не кэшируется: шрифт могли установить после прошлого запуска
+            if cached.get("families") == FONT_FAMILIES and path is not None and os.path.isfile(path):
+                return path
+        except (OSError, ValueError, AttributeError):
+            pass
+        path = None
+        for fam in FONT_FAMILIES:
+            try:
+                path = pygame.font.match_font(fam)
+            except Exception:
+                path = None
+            if path:
+                break
+        if path is None:
+            return None
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(FONT_CACHE, "w", encoding="utf-8") as f:
+                json.dump({"families": FONT_FAMILIES, "path": path}, f)
+        except OSError:
+            pass  # без кэша просто будем искать шрифт при каждом запуске
+        return path
+
     def _pick_font(self, size: int) -> pygame.font.Font:
-        for fam in ["Inter", "Montserrat", "Nunito", "DejaVu Sans", None]:
+        for path in (self._font_path, None):
             try:
-                path = pygame.font.match_font(fam) if fam else None
                 f = pygame.font.Font(path, size)
                 if f: return f
             except Exception:
                 pass
         return pygame.font.SysFont(None, size)
 
+    def _text(self, font: pygame.font.Font, text: str, color) -> pygame.Surface:
+        """font.render с кэшем: одни и те же надписи не растеризуются каждый кадр."""
+        key = (id(font), text, tuple(color))
+        surf = self._text_cache.get(key)
+        if surf is None:
+            if len(self._text_cache) >= TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            surf = self._text_cache[key] = font.render(text, True, color)
+        return surf
+
     # -------------------- ориентация / клетки --------------------
     @staticmethod
     def _file_rank_from_square(square: int, white_bottom: bool) -> Tuple[int, int]:
@@ -74,12 +135,8 @@ class UI:
     # -------------------- главный рендер --------------------
     def draw_board(self, board: chess.Board, selected: Optional[int], legal_sqs: List[int],
                    hints: List[int], last_move: Optional[chess.Move], white_bottom: bool):
-        # поле
-        for r in range(8):
-            for f in range(8):
-                rect = self._cell_rect(f, r)
-                pygame.draw.rect(self.screen, LIGHT if (r + f) % 2 == 0 else DARK, rect)
-        pygame.draw.rect(self.screen, EDGE, pygame.Rect(MARGIN, MARGIN, BOARD_SIZE, BOARD_SIZE), 2)
+        # поле с координатами — готовым слоем
+        self.screen.blit(self._static_board(white_bottom), (0, 0))
 
         # подсветки
         if last_move:
@@ -103,10 +160,22 @@ class UI:
             f, r = self._file_rank_from_square(sq, white_bottom)
             self._draw_piece(self._cell_rect(f, r), p)
 
-        self._draw_coords(white_bottom)
+    def _static_board(self, white_bottom: bool) -> pygame.Surface:
+        """Клетки, рамка и координаты не меняются за партию — рисуем их один раз на ориентацию."""
+        layer = self._board_layer.get(white_bottom)
+        if layer is None:
+            layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+            layer.fill(BG)
+            for r in range(8):
+                for f in range(8):
+                    pygame.draw.rect(layer, LIGHT if (r + f) % 2 == 0 else DARK, self._cell_rect(f, r))
+            pygame.draw.rect(layer, EDGE, pygame.Rect(MARGIN, MARGIN, BOARD_SIZE, BOARD_SIZE), 2)
+            self._draw_coords(layer, white_bottom)
+            self._board_layer[white_bottom] = layer
+        return layer
 
     # -------------------- разметка координат --------------------
-    def _draw_coords(self, white_bottom: bool):
+    def _draw_coords(self, target: pygame.Surface, white_bottom: bool):
         files = ['A','B','C','D','E','F','G','H']
         ranks = ['8','7','6','5','4','3','2','1']
         if not white_bottom:
@@ -116,14 +185,14 @@ class UI:
             s_top = self.small.render(ch, True, LABEL)
             s_bot = self.small.render(ch, True, LABEL)
             x = MARGIN + i*SQ + SQ//2 - s_top.get_width()//2
-            self.screen.blit(s_top, (x, MARGIN - s_top.get_height() - 6))
-            self.screen.blit(s_bot, (x, MARGIN + BOARD_SIZE + 6))
+            target.blit(s_top, (x, MARGIN - s_top.get_height() - 6))
+            target.blit(s_bot, (x, MARGIN + BOARD_SIZE + 6))
         for i, ch in enumerate(ranks):
             s_l = self.small.render(ch, True, LABEL)
             s_r = self.small.render(ch, True, LABEL)
             y = MARGIN + i*SQ + SQ//2 - s_l.get_height()//2
-            self.screen.blit(s_l, (MARGIN - s_l.get_width() - 8, y))
-            self.screen.blit(s_r, (MARGIN + BOARD_SIZE + 8, y))
+            target.blit(s_l, (MARGIN - s_l.get_width() - 8, y))
+            target.blit(s_r, (MARGIN + BOARD_SIZE + 8, y))
 
     # -------------------- спрайты: загрузка и рендер --------------------
     def _try_load_sprites(self):
@@ -146,6 +215,9 @@ class UI:
                 self._sprite_cache[key] = surf
 
     def _get_piece_sprite(self, piece: chess.Piece, cell_rect: pygame.Rect) -> Optional[pygame.Surface]:
+        if not self._sprites_loaded:
+            self._sprites_loaded = True
+            self._try_load_sprites()
         if not self._sprite_cache:
             return None
         prefix = "w" if piece.color else "b"
@@ -164,11 +236,17 @@ class UI:
 
     # -------------------- фигуры: спрайты или векторный фолбэк --------------------
     def _draw_piece(self, rect: pygame.Rect, piece: chess.Piece):
+        # масштабирование и суперсэмплинг — один раз на фигуру и размер клетки, дальше только blit
+        key = (piece.symbol(), rect.width)
+        surf = self._piece_cache.get(key)
+        if surf is None:
+            surf = self._piece_cache[key] = self._render_piece(rect, piece)
+        self.screen.blit(surf, surf.get_rect(center=rect.center))
+
+    def _render_piece(self, rect: pygame.Rect, piece: chess.Piece) -> pygame.Surface:
         spr = self._get_piece_sprite(piece, rect)
         if spr:
-            dest = spr.get_rect(center=rect.center)
-            self.screen.blit(spr, dest)
-            return
+            return spr
         # векторный фолбэк с суперсэмплингом (3x, затем даунскейл)
         hi = pygame.Surface((rect.width*3, rect.height*3), pygame.SRCALPHA)
         cx, cy = hi.get_width()//2, hi.get_height()//2
@@ -233,14 +311,14 @@ class UI:
                              (cx, cy - int(s*0.28)), 8)
 
         # даунскейл без «пилы»
-        lo = pygame.transform.smoothscale(hi, (rect.width, rect.height))
-        self.screen.blit(lo, rect)
+        return pygame.transform.smoothscale(hi, (rect.width, rect.height))
     # -------------------- панель --------------------
-    def draw_panel(self, text_main: str, text_sub: str, button_on: bool, tips: List[str]):
+    def draw_panel(self, text_main: str, text_sub: str, button_on: bool, tips: List[str],
+                   debug: Optional[List[str]] = None):
         pygame.draw.rect(self.screen, PANEL, pygame.Rect(0, HEIGHT, WIN_W, PANEL_H))
-        label = self.medium.render(text_main, True, TEXT)
+        label = self._text(self.medium, text_main, TEXT)
         self.screen.blit(label, (MARGIN, HEIGHT + 10))
-        hint = self.small.render(text_sub, True, TEXT)
+        hint = self._text(self.small, text_sub, TEXT)
         self.screen.blit(hint, (MARGIN, HEIGHT + 40))
 
         # кнопка справа
@@ -251,60 +329,89 @@ class UI:
         self.screen.blit(srf, (br.x - 4, br.y - 2))
         pygame.draw.rect(self.screen, (210,235,255) if button_on else (235,235,235), br, border_radius=18)
         pygame.draw.rect(self.screen, (80,120,180), br, 2, border_radius=18)
-        t = self.medium.render('Подсказки: ВКЛ' if button_on else 'Подсказки: ВЫКЛ', True, (20,40,80))
+        t = self._text(self.medium, 'Подсказки: ВКЛ' if button_on else 'Подсказки: ВЫКЛ', (20,40,80))
         self.screen.blit(t, (br.centerx - t.get_width() // 2, br.centery - t.get_height() // 2))
 
         if tips:
             x = br.x
             y = br.bottom + 12
             for s in tips:
-                self.screen.blit(self.small.render(s, True, TEXT), (x, y))
+                self.screen.blit(self._text(self.small, s, TEXT), (x, y))
                 y += 20
 
+        if debug:
+            self._draw_debug(debug)
+
+    # -------------------- отладочный оверлей статистики поиска --------------------
+    def _draw_debug(self, lines: List[str]):
+        rendered = [self.small.render(s, True, (235, 235, 235)) for s in lines]
+        w = max(r.get_width() for r in rendered) + 16
+        h = sum(r.get_height() + 2 for r in rendered) + 12
+        box = pygame.Surface((w, h), pygame.SRCALPHA)
+        box.fill((20, 20, 20, 190))
+        self.screen.blit(box, (MARGIN + 8, MARGIN + 8))
+        y = MARGIN + 14
+        for r in rendered:
+            self.screen.blit(r, (MARGIN + 16, y))
+            y += r.get_height() + 2
+
     # -------------------- меню --------------------
-    def prompt_menu(self) -> Tuple[str, int, float]:
+    def prompt_menu(self) -> Difficulty:
         clock = pygame.time.Clock()
         choice = 0
-        opts = [("Легко", 2, 0.2), ("Средне", 3, 0.1), ("Сложно", 4, 0.0)]
+        drawn = None  # перерисовываем, только когда выбор изменился
+        opts = LEVELS
         while True:
             for e in pygame.event.get():
                 if e.type == pygame.QUIT: pygame.quit(); raise SystemExit
+                if e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED): drawn = None  # окно затёрто — рисуем заново
                 if e.type == pygame.KEYDOWN:
                     if e.key == pygame.K_ESCAPE: pygame.quit(); raise SystemExit
                     if e.key == pygame.K_UP: choice = (choice - 1) % len(opts)
                     if e.key == pygame.K_DOWN: choice = (choice + 1) % len(opts)
-                    if e.key == pygame.K_RETURN: name, d, r = opts[choice]; return name, d, r
-            self.screen.fill((25,25,25))
-            title = self.large.render("Выберите сложность", True, (230,230,230))
+                    if e.key == pygame.K_RETURN: return opts[choice]
+            if drawn == choice:
+                clock.tick(60); continue
+            drawn = choice
+            self.screen.fill(BG)
+            title = self._text(self.large, "Выберите сложность", (230,230,230))
             self.screen.blit(title, (WIN_W // 2 - title.get_width() // 2, 80))
-            for i, (name, _, _) in enumerate(opts):
+            for i, level in enumerate(opts):
                 col = (255,255,255) if i == choice else (160,160,160)
-                txt = self.large.render(name, True, col)
+                txt = self._text(self.large, level.name, col)
                 self.screen.blit(txt, (WIN_W // 2 - txt.get_width() // 2, 160 + i*60))
-            helper = self.small.render("↑/↓ — выбор, Enter — подтвердить, Esc — выход", True, (200,200,200))
+            helper = self._text(self.small, "↑/↓ — выбор, Enter — подтвердить, Esc — выход", (200,200,200))
             self.screen.blit(helper, (WIN_W // 2 - helper.get_width() // 2, HEIGHT - 80))
-            pygame.display.flip(); clock.tick(60)
+            pygame.display.flip()
+            if self.first_frame_at is None:
+                self.first_frame_at = time.perf_counter()
+            clock.tick(60)
 
     def prompt_side(self) -> bool:
         clock = pygame.time.Clock()
         choice = 0
+        drawn = None
         opts = ["Белыми", "Чёрными"]
         while True:
             for e in pygame.event.get():
                 if e.type == pygame.QUIT: pygame.quit(); raise SystemExit
+                if e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED): drawn = None  # окно затёрто — рисуем заново
                 if e.type == pygame.KEYDOWN:
                     if e.key == pygame.K_ESCAPE: pygame.quit(); raise SystemExit
                     if e.key == pygame.K_UP: choice = (choice - 1) % len(opts)
                     if e.key == pygame.K_DOWN: choice = (choice + 1) % len(opts)
                     if e.key == pygame.K_RETURN: return choice == 0
-            self.screen.fill((25,25,25))
-            title = self.large.render("Выберите сторону", True, (230,230,230))
+            if drawn == choice:
+                clock.tick(60); continue
+            drawn = choice
+            self.screen.fill(BG)
+            title = self._text(self.large, "Выберите сторону", (230,230,230))
             self.screen.blit(title, (WIN_W // 2 - title.get_width() // 2, 80))
             for i, name in enumerate(opts):
                 col = (255,255,255) if i == choice else (160,160,160)
-                txt = self.large.render(name, True, col)
+                txt = self._text(self.large, name, col)
                 self.screen.blit(txt, (WIN_W // 2 - txt.get_width() // 2, 160 + i*60))
-            helper = self.small.render("↑/↓ — выбор, Enter — подтвердить", True, (200,200,200))
+            helper = self._text(self.small, "↑/↓ — выбор, Enter — подтвердить", (200,200,200))
             self.screen.blit(helper, (WIN_W // 2 - helper.get_width() // 2, HEIGHT - 80))
             pygame.display.flip(); clock.tick(60)
 